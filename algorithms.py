@@ -0,0 +1,332 @@
+'''
+Graph algorithms. They take DictGraph (or ArrayGraph), get compact CSR snapshot of it (csr.Snapshot) and work only with its arrays.
+Snapshot is cached by graph (DictGraph.snapshot), so several algorithms on unchanged graph build it only once.
+Snapshot itself can be given instead of graph, so algorithms can run in other thread while graph is edited. Algorithms which ignore directions
+(connected_components, is_tree, is_oil, minimum_spanning_tree) need undirected snapshot (g.snapshot(0)), others follow directions of the given snapshot.
+Directed graph is traversed along rib arrows (rib without arrows can be passed both ways), flags directed and weighted of graph are used,
+parallel ribs are separate arcs. Vertices are given and returned as names, ribs as rib indexes.
+
+bfs and dfs return vertices in order of visiting from start vertex.
+connected_components returns lists of vertices connected regardless of directions, strongly_connected_components uses directions (Tarjan algorithm).
+has_cycle, is_tree and is_oil (Euler cycle, pronounced "oiler") answer questions about the whole graph. is_tree ignores directions.
+dijkstra returns distances and ribs by which vertices are reached (binary heap), shortest_path returns length and ribs of path between two vertices.
+minimum_spanning_tree returns ribs of minimum spanning forest (Kruskal algorithm with union-find), directions are ignored.
+colour_ribs and colour_components show results in graph colours (rib_colours and ver_colours).
+
+'''
+
+from array import array
+from bisect import bisect_right
+from colorsys import hsv_to_rgb
+from heapq import heappush, heappop
+from csr import Snapshot
+
+
+def snapshot(g, directed = None):
+    if isinstance(g, Snapshot):
+        if directed is not None and bool(directed) != bool(g.directed):
+            raise ValueError('{} snapshot is given, {} one is needed'.format(*['directed' if e else 'undirected' for e in (g.directed, directed)]))
+        return g
+    if hasattr(g, 'snapshot'):
+        return g.snapshot(directed)
+    return Snapshot(g, directed)
+
+
+def bfs(g, start):
+    s = snapshot(g)
+    offsets, targets = s.offsets, s.targets
+    v = s.index[start]
+    seen = bytearray(len(s))
+    seen[v] = 1
+    order = [v]
+    k = 0
+    while k < len(order):
+        v = order[k]
+        k += 1
+        for p in range(offsets[v], offsets[v + 1]):
+            u = targets[p]
+            if not seen[u]:
+                seen[u] = 1
+                order.append(u)
+    return [s.names[v] for v in order]
+
+
+def dfs(g, start):
+    s = snapshot(g)
+    offsets, targets = s.offsets, s.targets
+    v = s.index[start]
+    seen = bytearray(len(s))
+    seen[v] = 1
+    order = [v]
+    stack = [(v, offsets[v])]  # vertex and place of its next arc
+    while stack:
+        v, p = stack[-1]
+        if p == offsets[v + 1]:
+            stack.pop()
+            continue
+        stack[-1] = (v, p + 1)
+        u = targets[p]
+        if not seen[u]:
+            seen[u] = 1
+            order.append(u)
+            stack.append((u, offsets[u]))
+    return [s.names[v] for v in order]
+
+
+def component_numbers(s):
+    # number of component for every vertex of undirected snapshot and number of components
+    offsets, targets = s.offsets, s.targets
+    numbers = array('l', [-1]) * len(s)
+    count = 0
+    for root in range(len(s)):
+        if numbers[root] != -1:
+            continue
+        numbers[root] = count
+        queue = [root]
+        while queue:
+            v = queue.pop()
+            for p in range(offsets[v], offsets[v + 1]):
+                u = targets[p]
+                if numbers[u] == -1:
+                    numbers[u] = count
+                    queue.append(u)
+        count += 1
+    return numbers, count
+
+
+def connected_components(g):
+    s = snapshot(g, directed = 0)
+    numbers, count = component_numbers(s)
+    components = [[] for _ in range(count)]
+    for v, c in enumerate(numbers):
+        components[c].append(s.names[v])
+    return components
+
+
+def strongly_connected_components(g):
+    # iterative Tarjan algorithm
+    s = snapshot(g)
+    offsets, targets = s.offsets, s.targets
+    n = len(s)
+    order = array('l', [-1]) * n  # number of vertex in dfs order
+    low = array('l', [0]) * n
+    on_stack = bytearray(n)
+    stack = []
+    components = []
+    counter = 0
+    for root in range(n):
+        if order[root] != -1:
+            continue
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        calls = [(root, offsets[root])]
+        while calls:
+            v, p = calls[-1]
+            if p < offsets[v + 1]:
+                calls[-1] = (v, p + 1)
+                u = targets[p]
+                if order[u] == -1:
+                    order[u] = low[u] = counter
+                    counter += 1
+                    stack.append(u)
+                    on_stack[u] = 1
+                    calls.append((u, offsets[u]))
+                elif on_stack[u] and order[u] < low[v]:
+                    low[v] = order[u]
+                continue
+            calls.pop()
+            if calls and low[v] < low[calls[-1][0]]:
+                low[calls[-1][0]] = low[v]
+            if low[v] == order[v]:
+                component = []
+                while True:
+                    u = stack.pop()
+                    on_stack[u] = 0
+                    component.append(s.names[u])
+                    if u == v:
+                        break
+                components.append(component)
+    return components
+
+
+def has_cycle(g):
+    s = snapshot(g)
+    if not s.directed:
+        return s.rib_count > len(spanning_forest(s, 0))
+    # directed cycle: dfs finds arc to vertex which is still on the stack, rib by which vertex was reached isn't passed back
+    offsets, targets, ribs = s.offsets, s.targets, s.ribs
+    state = bytearray(len(s))  # 0 - new, 1 - on stack, 2 - done
+    for root in range(len(s)):
+        if state[root]:
+            continue
+        state[root] = 1
+        calls = [(root, offsets[root], 0)]
+        while calls:
+            v, p, via = calls[-1]
+            if p == offsets[v + 1]:
+                state[v] = 2
+                calls.pop()
+                continue
+            calls[-1] = (v, p + 1, via)
+            u = targets[p]
+            if ribs[p] == via:
+                continue
+            if state[u] == 1:
+                return True
+            if not state[u]:
+                state[u] = 1
+                calls.append((u, offsets[u], ribs[p]))
+    return False
+
+
+def is_tree(g):
+    # connected graph with one rib less than vertices, directions are ignored
+    s = snapshot(g, directed = 0)
+    if not len(s) or s.rib_count != len(s) - 1:
+        return False
+    return component_numbers(s)[1] == 1
+
+
+def is_oil(g):
+    # Euler cycle exists: all ribs are in one component and every vertex has even degree (equal in and out degrees for directed graph with one arrow on every rib)
+    s = snapshot(g, directed = 0)
+    numbers, count = component_numbers(s)
+    if len({numbers[v] for v in range(len(s)) if s.offsets[v + 1] > s.offsets[v]}) > 1:
+        return False
+    if s.arrows and all(s.dirs[p] == 3 if s.targets[p] == v else s.dirs[p] in (1, 2) for v in range(len(s)) for p in s.arcs(v)):
+        # every rib has one arrow (loop has one arc with both bits): it is +1 to balance of its head and -1 to balance of its tail
+        balance = [0] * len(s)
+        for v in range(len(s)):
+            for p in s.arcs(v):
+                if s.targets[p] != v:
+                    balance[v] += 1 if s.dirs[p] == 1 else -1
+        return not any(balance)
+    for v in range(len(s)):
+        degree = s.offsets[v + 1] - s.offsets[v]
+        degree += sum(1 for p in s.arcs(v) if s.targets[p] == v)  # loop gives one arc but adds two to degree
+        if degree % 2:
+            return False
+    return True
+
+
+def dijkstra(g, start, target = None):
+    # distances from start to all reachable vertices (or until target is reached) and ribs by which they are reached
+    s = snapshot(g)
+    dist, via = search(s, s.index[start], s.index.get(target, -1))
+    names, ribs = s.names, s.ribs
+    return {names[v]: d for v, d in dist.items()}, {names[v]: ribs[p] for v, p in via.items()}
+
+
+def search(s, v, stop):
+    # dijkstra on snapshot: distances of reached vertex numbers and places of arcs by which they are reached
+    offsets, targets, weights = s.offsets, s.targets, s.weights
+    assert not weights or min(weights) >= 0, 'negative weights'
+    dist = {}
+    via = {}
+    best = {v: 0}
+    heap = [(0, v)]
+    while heap:
+        d, v = heappop(heap)
+        if v in dist:
+            continue
+        dist[v] = d
+        if v == stop:
+            break
+        for p in range(offsets[v], offsets[v + 1]):
+            u = targets[p]
+            du = d + weights[p]
+            if u not in dist and du < best.get(u, du + 1):
+                best[u] = du
+                via[u] = p
+                heappush(heap, (du, u))
+    return dist, {v: p for v, p in via.items() if v in dist}
+
+
+def shortest_path(g, a, b):
+    # length and list of ribs of the shortest path from a to b, None and [] if b can't be reached
+    s = snapshot(g)
+    start, end = s.index[a], s.index[b]
+    dist, via = search(s, start, end)
+    if end not in dist:
+        return None, []
+    path = []
+    v = end
+    while v != start:
+        p = via[v]
+        path.append(s.ribs[p])
+        v = bisect_right(s.offsets, p) - 1  # vertex which arc goes from
+    path.reverse()
+    return dist[end], path
+
+
+def spanning_forest(s, weighted):
+    # Kruskal algorithm with union-find (path halving and union by size), returns rib indexes
+    parent = array('l', range(len(s)))
+    size = array('l', [1]) * len(s)
+
+    def find(v):
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    arcs = [(v, p) for v in range(len(s)) for p in s.arcs(v) if v <= s.targets[p]]  # every rib once
+    if weighted:
+        arcs.sort(key = lambda arc: s.weights[arc[1]])
+    forest = []
+    for v, p in arcs:
+        a, b = find(v), find(s.targets[p])
+        if a == b:
+            continue
+        if size[a] < size[b]:
+            a, b = b, a
+        parent[b] = a
+        size[a] += size[b]
+        forest.append(s.ribs[p])
+    return forest
+
+
+def minimum_spanning_tree(g):
+    s = snapshot(g, directed = 0)
+    return spanning_forest(s, s.weighted)
+
+
+def colour_ribs(g, ribs, colour = '#ff0000'):
+    # ribs deleted since they were found are skipped
+    for i in ribs:
+        if i in g.ribs:
+            g.rib_colours[i] = colour
+
+
+def colour_components(g, components):
+    # every component gets its own fill colour, ribs inside component get it too
+    for k, component in enumerate(components):
+        colour = component_colour(k)
+        for name in component:
+            g.ver_colours[name] = (colour, g.ver_colours.get(name)[1])
+        names = set(component)
+        for name in component:
+            for i in g.vertices.get(name):
+                rib = g.ribs.get(i)
+                if rib[0] in names and rib[1] in names:
+                    g.rib_colours[i] = colour
+
+
+def component_colour(k):
+    # colours with different hue for different k (golden ratio steps)
+    r, g, b = hsv_to_rgb((k * 0.618033988749895) % 1, 0.6, 0.95)
+    return '#{:02x}{:02x}{:02x}'.format(int(r * 255), int(g * 255), int(b * 255))
+
+
+if __name__ == '__main__':
+    from graph import DictGraph
+    g = DictGraph('a', 'b', 'c', 'd', 'e')
+    g.weighted = 1
+    g.set_rib('a', 'b', 4)
+    g.set_rib('b', 'c', 1)
+    g.set_rib('a', 'c', 2)
+    g.set_rib('d', 'e', 1)
+    print(bfs(g, 'a'), dfs(g, 'a'), connected_components(g), has_cycle(g), is_tree(g))
+    print(shortest_path(g, 'a', 'b'), minimum_spanning_tree(g))
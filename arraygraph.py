@@ -0,0 +1,394 @@
+from array import array
+from collections.abc import MutableMapping
+from graph import Graph, DictGraph, pair
+from spatial import GridIndex
+
+
+class ArrayGraph(Graph):
+    '''
+
+    ArrayGraph is another implementation of graph with the same public interface as DictGraph. It is intended for graphs with millions of ribs.
+    Vertices are stored the same way as in DictGraph (self.vertices, self.form, self.ver_sizes, self.ver_colours and self.pairs are usual dicts, self.vertex_grid and self.rib_grid are the same spatial indexes).
+    Ribs are stored in parallel typed arrays where rib index i uses slot i-1:
+    self.ends stores two vertex numbers for each slot (self.names and self.numbers translate vertex numbers to names and back),
+    self.weights stores weights, self.dirs stores directions as bits (1 for the first vertex, 2 for the second one), self.alive marks used slots.
+    self.orientation, self.points, self.points_simple, self.layout and self.layout_simple store geometry as flat float rows, orientation -1 means there is no geometry yet.
+    Rib colours are numbers in self.palette, -1 means there is no colour.
+    Slots of deleted ribs are kept in self.free and are reused by set_rib, so rib indexes can be reused too.
+    Geometry is lazy and invalidated the same way as in DictGraph (self.stale, self.changed and update_geometry), snapshots are cached the same way too (self.version and self.snapshots).
+
+    self.ribs, self.rib_colours, self.weight_colours, self.rib_points, self.rib_points_simple, self.rib_orientation, self.rib_text_layout and self.rib_text_layout_simple are
+    dict-like views over these arrays, so GraphCanvas, Window and DictGraph methods work with ArrayGraph without changes. self.ribs values are Rib objects that behave like lists [a, b, w, dir].
+
+    '''
+
+    def __init__(self, *args):
+        self.vertices = {e: {} for e in args}
+        self.form = {}
+        self.ver_colours = {e: ('white', 'black') for e in args}
+        self.ver_sizes = {e: 20 for e in args}
+        self.pairs = {}
+        self.vertex_grid = GridIndex()
+        self.rib_grid = GridIndex(250)
+        self.stale = {}
+        self.changed = {}
+        self.invalidations = 0
+        self.version = 0
+        self.snapshots = {}
+
+        self.names = []
+        self.numbers = {}
+        self.ends = array('l')
+        self.weights = array('d')
+        self.dirs = array('B')
+        self.alive = array('B')
+        self.orientation = array('b')
+        self.points = array('d')
+        self.points_simple = array('d')
+        self.layout = array('d')
+        self.layout_simple = array('d')
+        self.colours = array('l')
+        self.wcolours = array('l')
+        self.palette = []
+        self.palette_numbers = {}
+        self.free = []
+
+        self.directed = 0
+        self.weighted = 0
+        self.multigraph = 0
+
+    set_form = DictGraph.set_form
+    get_ribs = DictGraph.get_ribs
+    rib_count = DictGraph.rib_count
+    has_rib = DictGraph.has_rib
+    view = DictGraph.view
+    find_points_for_rib = DictGraph.find_points_for_rib
+    find_text_layout = DictGraph.find_text_layout
+    find_geometry = DictGraph.find_geometry
+    find_families_geometry = DictGraph.find_families_geometry
+    move_vertex = DictGraph.move_vertex
+    resize_vertex = DictGraph.resize_vertex
+    update_geometry = DictGraph.update_geometry
+    find_vertex = DictGraph.find_vertex
+    find_rib = DictGraph.find_rib
+    index_rib = DictGraph.index_rib
+    invalidate = DictGraph.invalidate
+    forget_geometry = DictGraph.forget_geometry
+    take_changed = DictGraph.take_changed
+    add_to_family = DictGraph.add_to_family
+    del_from_family = DictGraph.del_from_family
+    insert_to_family = DictGraph.insert_to_family
+    touch = DictGraph.touch
+    snapshot = DictGraph.snapshot
+    reweigh_rib = DictGraph.reweigh_rib
+
+    def set_vertices(self, *args):
+        for n in args:
+            assert self.vertices.get(n) == None, 'name is already used'
+            self.vertices[n] = {}
+        self.touch()
+
+    def number(self, name):
+        n = self.numbers.get(name)
+        if n is None:
+            n = len(self.names)
+            self.names.append(name)
+            self.numbers[name] = n
+        return n
+
+    def colour_number(self, col):
+        if col is None:
+            return -1
+        n = self.palette_numbers.get(col)
+        if n is None:
+            n = len(self.palette)
+            self.palette.append(col)
+            self.palette_numbers[col] = n
+        return n
+
+    def set_rib(self, a, b, w=1, dir=set()):
+        x = self.vertices.get(a)
+        y = self.vertices.get(b)
+        if self.free:
+            s = self.free.pop()
+        else:
+            s = len(self.alive)
+            self.ends.extend((0, 0))
+            self.weights.append(0)
+            self.dirs.append(0)
+            self.alive.append(0)
+            self.orientation.append(-1)
+            self.points.extend([0.0] * 12)
+            self.points_simple.extend([0.0] * 6)
+            self.layout.extend([0.0] * 6)
+            self.layout_simple.extend([0.0] * 6)
+            self.colours.append(-1)
+            self.wcolours.append(-1)
+        i = s + 1
+        self.write_rib(s, a, b, w, dir)
+        self.alive[s] = 1
+        x[i] = None
+        y[i] = None
+        self.add_to_family(i, pair(a, b))
+        return i
+
+    def set_ribs(self, ribs):
+        # rib indexes of ArrayGraph can be reused, so they are returned as list
+        return [self.set_rib(*rib) for rib in ribs]
+
+    def restore_rib(self, i, a, b, w, dir, place):
+        # slot of deleted rib is free until it is reused, undo restores ribs in reverse order, so it is usually at the end of self.free
+        s = i - 1
+        k = len(self.free) - 1
+        while k >= 0 and self.free[k] != s:
+            k -= 1
+        assert k >= 0, 'rib index is used'
+        self.free[k] = self.free[-1]
+        self.free.pop()
+        self.write_rib(s, a, b, w, dir)
+        self.alive[s] = 1
+        self.vertices.get(a)[i] = None
+        self.vertices.get(b)[i] = None
+        self.insert_to_family(i, pair(a, b), place)
+        return i
+
+    def write_rib(self, s, a, b, w, dir):
+        self.ends[2*s] = self.number(a)
+        self.ends[2*s+1] = self.number(b)
+        self.weights[s] = w
+        self.dirs[s] = (a in dir) | (b in dir) << 1
+
+    def del_rib(self, i):
+        assert self.ribs.get(i), 'no such rib'
+        s = i - 1
+        a, b = self.names[self.ends[2*s]], self.names[self.ends[2*s+1]]
+        self.vertices.get(a).pop(i, None)
+        self.vertices.get(b).pop(i, None)
+        self.del_from_family(i, pair(a, b))
+        self.rib_grid.remove(i)
+        self.alive[s] = 0
+        self.orientation[s] = -1
+        self.colours[s] = -1
+        self.wcolours[s] = -1
+        self.free.append(s)
+
+    def rib_dicts(self):
+        return [self.rib_colours, self.weight_colours, self.rib_points, self.rib_points_simple, self.rib_orientation,
+                self.rib_text_layout, self.rib_text_layout_simple, self.ribs]
+
+    def del_vertex(self, a):
+        x = self.vertices.get(a).copy()
+        for n in x:
+            self.del_rib(n)
+        for dict in [self.form, self.ver_sizes, self.ver_colours, self.vertices]:
+            dict.pop(a, None)
+        self.vertex_grid.remove(a)
+        n = self.numbers.pop(a, None)
+        if n is not None:
+            self.names[n] = None
+        self.touch()
+
+    def rename_vertex(self, old, new):
+        # ribs store vertex numbers, so only names table and dicts with vertex keys are changed
+        self.touch()
+        self.invalidate(self.vertices.get(old))
+        for i in self.vertices.get(old):
+            rib = self.ribs.get(i)
+            other = rib[1] if rib[0] == old else rib[0]
+            family = self.pairs.pop(pair(old, other), None)
+            if family is not None:
+                self.pairs[pair(new, other)] = family
+        n = self.numbers.pop(old, None)
+        if n is not None:
+            self.names[n] = new
+            self.numbers[new] = n
+        for dict in [self.form, self.ver_sizes, self.ver_colours, self.vertices]:
+            dict[new] = dict.get(old)
+            del dict[old]
+        self.vertex_grid.remove(old)
+        if self.form.get(new):
+            self.vertex_grid.insert(new, *self.form.get(new), *self.form.get(new))
+
+    # views
+
+    @property
+    def ribs(self):
+        return RibColumn(self, lambda s: Rib(self, s), lambda s, v: self.write_rib(s, *v), None)
+
+    @property
+    def rib_colours(self):
+        return RibColumn(self, *self.colour_accessors(self.colours))
+
+    @rib_colours.setter
+    def rib_colours(self, value):
+        self.rib_colours.replace(value)
+
+    @property
+    def weight_colours(self):
+        return RibColumn(self, *self.colour_accessors(self.wcolours))
+
+    @weight_colours.setter
+    def weight_colours(self, value):
+        self.weight_colours.replace(value)
+
+    def colour_accessors(self, column):
+        def get(s):
+            return self.palette[column[s]] if column[s] != -1 else None
+        def set(s, v):
+            column[s] = self.colour_number(v)
+        def clear(s):
+            column[s] = -1
+        return get, set, clear
+
+    @property
+    def rib_orientation(self):
+        def get(s):
+            return self.orientation[s] if self.orientation[s] != -1 else None
+        def set(s, v):
+            self.orientation[s] = v
+        def clear(s):
+            self.orientation[s] = -1
+        return RibColumn(self, get, set, clear)
+
+    @property
+    def rib_points(self):
+        def get(s):
+            if self.orientation[s] == -1:
+                return None
+            p = self.points[12*s:12*s+12]
+            return [tuple((p[k+j], p[k+j+1]) for j in range(0, 6, 2)) for k in (0, 6)]
+        def set(s, v):
+            self.points[12*s:12*s+12] = array('d', [c for line in v for point in line for c in point])
+        return RibColumn(self, get, set, self.clear_geometry)
+
+    @property
+    def rib_points_simple(self):
+        def get(s):
+            if self.orientation[s] == -1:
+                return None
+            p = self.points_simple[6*s:6*s+6]
+            return [(p[k], p[k+1]) for k in range(0, 6, 2)]
+        def set(s, v):
+            self.points_simple[6*s:6*s+6] = array('d', [c for point in v for c in point])
+        return RibColumn(self, get, set, self.clear_geometry)
+
+    @property
+    def rib_text_layout(self):
+        return RibColumn(self, *self.layout_accessors(self.layout))
+
+    @property
+    def rib_text_layout_simple(self):
+        return RibColumn(self, *self.layout_accessors(self.layout_simple))
+
+    def layout_accessors(self, column):
+        def get(s):
+            if self.orientation[s] == -1:
+                return None
+            p = column[6*s:6*s+6]
+            return [(p[0], (p[1], p[2])), (p[3], (p[4], p[5]))]
+        def set(s, v):
+            column[6*s:6*s+6] = array('d', [v[0][0], *v[0][1], v[1][0], *v[1][1]])
+        return get, set, self.clear_geometry
+
+    def clear_geometry(self, s):
+        self.orientation[s] = -1
+
+
+class RibColumn(MutableMapping):
+    '''
+    Dict-like view over one ArrayGraph column. Keys are rib indexes, get, set and clear functions take a slot number. Value None means there is no such item.
+    '''
+    __slots__ = ('g', 'get_value', 'set_value', 'clear_value')
+
+    def __init__(self, g, get, set, clear):
+        self.g = g
+        self.get_value = get
+        self.set_value = set
+        self.clear_value = clear
+
+    def slot(self, i):
+        s = i - 1 if type(i) is int else -1
+        if s < 0 or s >= len(self.g.alive) or not self.g.alive[s]:
+            raise KeyError(i)
+        return s
+
+    def __getitem__(self, i):
+        v = self.get_value(self.slot(i))
+        if v is None:
+            raise KeyError(i)
+        return v
+
+    def __setitem__(self, i, v):
+        self.set_value(self.slot(i), v)
+
+    def __delitem__(self, i):
+        s = self.slot(i)
+        if self.clear_value is None:
+            self.g.del_rib(i)
+        elif self.get_value(s) is None:
+            raise KeyError(i)
+        else:
+            self.clear_value(s)
+
+    def __iter__(self):
+        alive = self.g.alive
+        for s in range(len(alive)):
+            if alive[s] and self.get_value(s) is not None:
+                yield s + 1
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def replace(self, value):
+        for s in range(len(self.g.alive)):
+            self.clear_value(s)
+        self.update(value)
+
+
+class Rib():
+    '''
+    List-like row of ArrayGraph.ribs: rib[0] and rib[1] are vertex names, rib[2] is weight and rib[3] is set of directions.
+    '''
+    __slots__ = ('g', 's')
+
+    def __init__(self, g, s):
+        self.g = g
+        self.s = s
+
+    def __getitem__(self, k):
+        g, s = self.g, self.s
+        if k == 0 or k == 1:
+            return g.names[g.ends[2*s+k]]
+        if k == 2:
+            w = g.weights[s]
+            return int(w) if w.is_integer() else w
+        if k == 3:
+            d = g.dirs[s]
+            return {g.names[g.ends[2*s+e]] for e in (0, 1) if d >> e & 1}
+        raise IndexError(k)
+
+    def __setitem__(self, k, v):
+        g, s = self.g, self.s
+        if k == 0 or k == 1:
+            g.ends[2*s+k] = g.number(v)
+        elif k == 2:
+            g.weights[s] = v
+        elif k == 3:
+            g.dirs[s] = (self[0] in v) | (self[1] in v) << 1
+        else:
+            raise IndexError(k)
+
+    def __len__(self):
+        return 4
+
+    def __iter__(self):
+        return iter([self[k] for k in range(4)])
+
+    def index(self, v):
+        return [self[0], self[1]].index(v)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
@@ -0,0 +1,519 @@
+'''
+Benchmarks for DictGraph and ArrayGraph. Every function prints its results and returns them, so they can be run one by one from the interpreter or all together as a script.
+
+suite is reproducible benchmark of graph operations and GraphCanvas.view_graph over sizes and multiplicities of parallel ribs. Canvas works on RecordingCanvas,
+so no display is needed, canvas_calls counts its Tcl calls.
+bench_batch draws graph through real Tcl interpreter (tcl_canvas) with and without batched item creation. The gain of batching is small, it saves only
+Python-to-Tcl call overhead: about 20% (2000 ribs: 0.075s unbatched, 0.058s batched; 10000 ribs: 0.36s and 0.28s), and real drawing by Tk isn't measured at all. save_results writes suite results to JSON file, compare reports results slower than the stored baseline:
+    python bench.py --suite --save baseline.json
+    python bench.py --suite --baseline baseline.json
+exits with status 1 if there are regressions. Without --suite all other benchmarks are run.
+Reference results of the default suite are kept next to this file (BASELINE, bench_baseline.json), --baseline without file name compares with them.
+They were measured on one machine, so times of other machines differ: save your own baseline before changes and compare with it after them,
+and update bench_baseline.json (--save with BASELINE path) when the changes make the suite faster or slower on purpose.
+'''
+
+import argparse
+import json
+import os
+import pickle
+import resource
+import sys
+import tempfile
+import tracemalloc
+from collections import Counter
+from math import sqrt
+from time import perf_counter
+from graph import *
+from canvas import GraphCanvas
+from arraygraph import ArrayGraph
+import algorithms
+import generators
+import graphfile
+import layout
+import svg
+import random
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+
+def timeit(func, *args, repeat = 5):
+    best = None
+    for _ in range(repeat):
+        start = perf_counter()
+        func(*args)
+        t = perf_counter() - start
+        if best is None or t < best:
+            best = t
+    return best
+
+
+def hub_graph(n):
+    # hub 'a' with n parallel ribs to 'b' and n ribs to other vertices
+    g = DictGraph('a', 'b', *['v' + str(k) for k in range(n)])
+    for k in range(n):
+        g.set_rib('a', 'b')
+        g.set_rib('a', 'v' + str(k))
+    return g
+
+
+def bench_get_ribs(sizes = (100, 1000, 5000)):
+    # compares the old list intersection of two rib lists with the pair index
+    def old_get_ribs(g, a, b):
+        x = list(g.vertices.get(a))
+        y = list(g.vertices.get(b))
+        return [i for i in x if i in y]
+
+    results = []
+    for n in sizes:
+        g = hub_graph(n)
+        old = timeit(old_get_ribs, g, 'a', 'b', repeat = 1)
+        new = timeit(g.get_ribs, 'a', 'b')
+        count = timeit(g.rib_count, 'a', 'b')
+        results.append((n, old, new, count))
+        print('degree {:>6}: old get_ribs {:.6f}s, new get_ribs {:.6f}s, rib_count {:.7f}s'.format(2*n, old, new, count))
+    return results
+
+
+def pairs_graph(cls, n, v = 200):
+    # graph without form with n ribs spread evenly between all pairs of v vertices, and form for it
+    names = ['v' + str(k) for k in range(v)]
+    g = cls(*names)
+    pairs = [(a, b) for k, a in enumerate(names) for b in names[k+1:]]
+    for k in range(n):
+        a, b = pairs[k % len(pairs)]
+        if k // len(pairs) % 2:
+            a, b = b, a
+        g.set_rib(a, b, k, {a})
+    return g, [[50 + 100*(k % 20), 50 + 100*(k // 20)] for k in range(v)]
+
+
+def soak_ribs(n = 10**6, window = 1000):
+    # creates and deletes n ribs keeping window ribs alive, memory must stay flat
+    names = ['v' + str(k) for k in range(100)]
+    g = DictGraph(*names)
+    g.set_form(*[[50 + 100*(k % 10), 50 + 100*(k // 10)] for k in range(100)])
+    start = None
+    for k in range(n):
+        a, b = names[k % 100], names[(k + 1 + k//100 % 99) % 100]
+        i = g.set_rib(a, b, k, {a})
+        g.update_geometry([i])
+        g.rib_colours[i] = '#000000'
+        g.weight_colours[i] = '#ffffff'
+        if k >= window:
+            g.del_rib(i - window)
+        if k == 2*window:
+            start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    end = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print('{} ribs created and deleted: peak memory {} KB before, {} KB after'.format(n, start, end))
+    assert end - start < 1024, 'memory grows during rib creating and deleting'
+    assert all(len(dict) == window for dict in g.rib_dicts())
+    return start, end
+
+
+def bench_memory(cls, n = 10**5):
+    # memory of graph with n ribs with geometry and colours
+    tracemalloc.start()
+    g, form = pairs_graph(cls, n)
+    g.set_form(*form)
+    g.update_geometry()
+    for i in g.ribs:
+        g.rib_colours[i] = '#000000'
+        g.weight_colours[i] = '#ffffff'
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('{}: {} ribs take {:.1f} MB, {} bytes per rib'.format(cls.__name__, n, size / 2**20, size // n))
+    return size
+
+
+def bench_geometry(n = 10**5):
+    # scalar find_points_for_rib + find_text_layout for every rib against find_geometry
+    g, form = pairs_graph(DictGraph, n)
+
+    def scalar():
+        g.form = {name: form[k] for k, name in enumerate(sorted(g.vertices))}
+        for i in g.ribs:
+            g.find_points_for_rib(i)
+            g.find_text_layout(i)
+
+    def bulk():
+        g.set_form(*form)
+        g.update_geometry()
+
+    old = timeit(scalar, repeat = 1)
+    expected = [dict(d) for d in g.rib_dicts()[2:7]]
+    new = timeit(bulk, repeat = 1)
+    for d, e in zip(g.rib_dicts()[2:7], expected):
+        assert all(abs(x - y) < 1e-9 for i in g.ribs for x, y in zip(flatten(d[i]), flatten(e[i])))
+    print('{} ribs: scalar geometry {:.3f}s, find_geometry {:.3f}s'.format(n, old, new))
+    return old, new
+
+
+def bench_file(n = 10**5):
+    # pickle against graphfile: time of saving and loading and file size
+    g, form = pairs_graph(DictGraph, n)
+    g.set_form(*form)
+    g.update_geometry()
+    folder = tempfile.mkdtemp()
+    old_name, new_name = os.path.join(folder, 'graph.pickle'), os.path.join(folder, 'graph.grph')
+
+    def dump():
+        with open(old_name, 'wb') as f:
+            pickle.dump(g, f)
+
+    def load():
+        with open(old_name, 'rb') as f:
+            pickle.load(f)
+
+    results = {
+        'pickle': (timeit(dump, repeat = 1), timeit(load, repeat = 1), os.path.getsize(old_name)),
+        'graphfile': (timeit(graphfile.save, g, new_name, repeat = 1), timeit(graphfile.load, new_name, repeat = 1), os.path.getsize(new_name)),
+    }
+    for name, (save, load, size) in results.items():
+        print('{}: {} ribs saved in {:.3f}s, loaded in {:.3f}s, file is {:.1f} MB'.format(name, n, save, load, size / 2**20))
+    os.remove(old_name)
+    os.remove(new_name)
+    os.rmdir(folder)
+    return results
+
+
+def bench_bulk_load(n = 10**5):
+    # building graph with form: geometry computed after every set_rib (as it was before) against lazy geometry
+    names = ['v' + str(k) for k in range(200)]
+    form = [[50 + 100*(k % 20), 50 + 100*(k // 20)] for k in range(200)]
+    pairs = [(a, b) for k, a in enumerate(names) for b in names[k+1:]]
+
+    def build(eager, draw):
+        g = DictGraph(*names)
+        g.set_form(*form)
+        for k in range(n):
+            i = g.set_rib(*pairs[k % len(pairs)], k)
+            if eager:
+                g.update_geometry([i])
+        if draw:
+            g.update_geometry()
+
+    results = {
+        'eager': timeit(build, 1, 1, repeat = 1),
+        'lazy, computed once': timeit(build, 0, 1, repeat = 1),
+        'lazy, never drawn': timeit(build, 0, 0, repeat = 1),
+    }
+    for name, t in results.items():
+        print('{} ribs, {} geometry: {:.3f}s'.format(n, name, t))
+    return results
+
+
+def bench_layout(sizes = (10**3, 10**4, 10**5), iterations = 3, processes = (1, os.cpu_count())):
+    # iterations of force_layout per second for random graphs with 2 ribs per vertex
+    results = []
+    for n in sizes:
+        names = ['v' + str(k) for k in range(n)]
+        g = DictGraph(*names)
+        rand = random.Random(n)
+        for k in range(2 * n):
+            g.set_rib(names[rand.randrange(n)], names[rand.randrange(n)])
+        for p in sorted(set(processes)):
+            g.form = {}
+            t = timeit(layout.force_layout, g, iterations, 80, p, repeat = 1)
+            results.append((n, p, iterations / t))
+            print('{} vertices, {} processes: {:.2f} layout iterations per second'.format(n, p, iterations / t))
+    return results
+
+
+def bench_generators(m = 10**6):
+    # time of building graphs with about m ribs by every model
+    models = {
+        'gnm': (generators.gnm, m // 5, m),
+        'barabasi_albert': (generators.barabasi_albert, m // 2, 2),
+        'grid_graph': (generators.grid_graph, int((m // 2) ** 0.5), int((m // 2) ** 0.5)),
+        'tree': (generators.tree, m + 1),
+    }
+    results = {}
+    for name, (func, *args) in models.items():
+        results[name] = timeit(func, *args, repeat = 1)
+        print('{}: {} ribs in {:.2f}s'.format(name, m, results[name]))
+    return results
+
+
+def bench_algorithms(n = 2 * 10**5, m = 10**6):
+    # time of every algorithm on random weighted graph with m ribs. Snapshot is built by the first test and cached by graph, so algorithms show only their own time
+    results = {}
+    for directed in (0, 1):
+        g = generators.gnm(n, m, weighted = 1, directed = directed, seed = 1)
+        start = next(iter(g.vertices))
+        tests = {
+            'snapshot': (g.snapshot, ),
+            'bfs': (algorithms.bfs, g, start),
+            'dfs': (algorithms.dfs, g, start),
+            'connected_components': (algorithms.connected_components, g),
+            'strongly_connected_components': (algorithms.strongly_connected_components, g),
+            'has_cycle': (algorithms.has_cycle, g),
+            'dijkstra': (algorithms.dijkstra, g, start),
+            'minimum_spanning_tree': (algorithms.minimum_spanning_tree, g),
+        }
+        for name, (func, *args) in tests.items():
+            t = timeit(func, *args, repeat = 1)
+            results[(name, directed)] = t
+            print('{}{}: {} ribs in {:.2f}s'.format(name, ' (directed)' if directed else '', m, t))
+    return results
+
+
+class RecordingCanvas(GraphCanvas):
+    '''
+    Stand-in for GraphCanvas without display. Methods of tkinter Canvas used by GraphCanvas only count calls (self.calls) and keep items in self.items,
+    so view_graph and refresh run the same code as on the screen without Tcl work. self.width and self.height are the size of the visible window.
+    '''
+    def __init__(self, width = 600, height = 400):
+        self.calls = Counter()
+        self.items = {}
+        self.next_item = 1
+        self.width = width
+        self.height = height
+        self.setup()
+        self.batching = 0  # calls are counted one by one
+
+    def create(self, kind, *args, **kwargs):
+        self.calls['create_' + kind] += 1
+        item = self.next_item
+        self.next_item += 1
+        tags = kwargs.get('tag', kwargs.get('tags', ()))
+        self.items[item] = (tags,) if isinstance(tags, str) else tuple(tags)
+        return item
+
+    def create_oval(self, *args, **kwargs):
+        return self.create('oval', *args, **kwargs)
+
+    def create_line(self, *args, **kwargs):
+        return self.create('line', *args, **kwargs)
+
+    def create_text(self, *args, **kwargs):
+        return self.create('text', *args, **kwargs)
+
+    def coords(self, item, *args):
+        self.calls['coords'] += 1
+        return [0.0] * 4
+
+    def itemconfigure(self, item, **kwargs):
+        self.calls['itemconfigure'] += 1
+
+    def move(self, tag, dx, dy):
+        self.calls['move'] += 1
+
+    def delete(self, *tags):
+        self.calls['delete'] += 1
+        for tag in tags:
+            if tag == 'all':
+                self.items = {}
+            elif tag in self.items:
+                del self.items[tag]
+            else:
+                for item in [item for item, item_tags in self.items.items() if tag in item_tags]:
+                    del self.items[item]
+
+    def bind(self, *args):
+        pass
+
+    def after_idle(self, func):
+        return None
+
+    def canvasx(self, x):
+        return x
+
+    def canvasy(self, y):
+        return y
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+
+def suite_graph(n, multiplicity, cls = DictGraph):
+    # n ribs between about n/multiplicity pairs of vertices, every pair has multiplicity parallel ribs
+    v = max(2, int((1 + sqrt(1 + 8 * n / multiplicity)) / 2))
+    g, form = pairs_graph(cls, n, v)
+    g.weighted = g.multigraph = 1  # weights and curved ribs are drawn
+    return g, form
+
+
+def timed(setup, func, repeat = 3):
+    # best time of func(state) for new state made by setup every time, setup isn't timed
+    best = None
+    for _ in range(repeat):
+        state = setup()
+        start = perf_counter()
+        func(state)
+        t = perf_counter() - start
+        if best is None or t < best:
+            best = t
+    return best
+
+
+def suite(sizes = (10**3, 10**4), multiplicities = (1, 8, 32), repeat = 3):
+    # times of graph operations for every size (number of ribs) and multiplicity of parallel ribs, result keys are 'operation n=... m=...'
+    results = {}
+    for n in sizes:
+        for m in multiplicities:
+            random.seed(n * m)
+
+            def built():
+                g, form = suite_graph(n, m)
+                g.set_form(*form)
+                return g
+
+            def drawn():
+                g = built()
+                g.update_geometry()
+                return g
+
+            tests = {
+                'set_rib': (lambda: None, lambda state: suite_graph(n, m)),
+                'get_ribs': (built, lambda g: [g.get_ribs(a, b) for a, b in list(g.pairs)]),
+                'find_points_for_rib': (built, lambda g: [g.find_points_for_rib(i) for i in g.ribs]),
+                'find_text_layout': (drawn, lambda g: [g.find_text_layout(i) for i in g.ribs]),
+                'update_geometry': (built, lambda g: g.update_geometry()),
+                'del_rib': (built, lambda g: [g.del_rib(i) for i in list(g.ribs)[::2]]),
+                'del_vertex': (built, lambda g: [g.del_vertex(name) for name in sorted(g.vertices)[::10]]),
+                'rename_vertex': (built, lambda g: [g.rename_vertex(name, name + '_') for name in sorted(g.vertices)[::10]]),
+                'pickle': (drawn, lambda g: pickle.loads(pickle.dumps(g))),
+                'view_graph': (drawn, lambda g: RecordingCanvas().view_graph(g)),
+            }
+            for name, (setup, func) in tests.items():
+                results['{} n={} m={}'.format(name, n, m)] = timed(setup, func, repeat)
+        results['random_graph n={}'.format(n)] = timed(lambda: None, lambda state: random_graph(n // 5, n, seed = n), repeat)
+    for key, t in results.items():
+        print('{:<40} {:.4f}s'.format(key, t))
+    return results
+
+
+def canvas_calls(n = 10**4, multiplicity = 8):
+    # Tcl calls made by view_graph and by refresh after moving one vertex
+    g, form = suite_graph(n, multiplicity)
+    g.set_form(*form)
+    canvas = RecordingCanvas(10**6, 10**6)
+    canvas.culling_limit = 10**9
+    canvas.view_graph(g)
+    drawn = dict(canvas.calls)
+    canvas.calls.clear()
+    name = sorted(g.vertices)[0]
+    g.move_vertex(name, tuple(g.form.get(name)))
+    canvas.mark_vertex(name)
+    canvas.refresh(g)
+    print('view_graph of {} ribs: {}, refresh of one vertex: {}'.format(n, drawn, dict(canvas.calls)))
+    return drawn, dict(canvas.calls)
+
+
+def bench_svg(cls, n = 10**5):
+    # picture of graph with computed geometry, so only writing is timed, and picture of graph without geometry, which is computed and forgotten by chunks
+    random.seed(n)
+    g, form = suite_graph(n, 1, cls)
+    g.set_form(*form)
+    g.update_geometry()
+    filename = os.path.join(tempfile.mkdtemp(), 'graph.svg')
+    t = timeit(svg.save, g, filename, repeat = 1)
+    print('{}: {} ribs drawn to SVG in {:.3f}s, file is {:.1f} MB'.format(cls.__name__, n, t, os.path.getsize(filename) / 2**20))
+    g.forget_geometry(list(g.ribs))
+    t_lazy = timeit(svg.save, g, filename, repeat = 1)
+    print('{}: {} ribs without geometry drawn to SVG in {:.3f}s'.format(cls.__name__, n, t_lazy))
+    os.remove(filename)
+    return t
+
+
+def tcl_canvas():
+    # GraphCanvas on Tcl interpreter without Tk: canvas widget is Tcl procedure which only counts items, so Tcl calls are real but nothing is drawn
+    from tkinter import Tcl
+    canvas = GraphCanvas.__new__(GraphCanvas)
+    canvas.tk = Tcl().tk
+    canvas._w = '.canvas'
+    canvas._tclCommands = None
+    canvas.tk.eval('''
+        set items 0
+        proc .canvas {command args} {
+            if {$command eq "create"} {return [incr ::items]}
+            if {$command in {canvasx canvasy}} {return [lindex $args 0]}
+        }
+        proc winfo args {return 1000000}
+        proc bind args {}
+    ''')
+    canvas.setup()
+    canvas.culling_limit = 10**9
+    return canvas
+
+
+def bench_batch(n = 10**4, multiplicity = 8, repeat = 3):
+    # view_graph with item per Tcl call and with batched creation, only the cost of Python and Tcl calls is measured
+    random.seed(n)
+    results = {}
+    for batching in (0, 1):
+        def view(g):
+            canvas = tcl_canvas()
+            canvas.batching = batching
+            canvas.view_graph(g)
+            assert None not in canvas.rib_items.values() and None not in canvas.weight_items.values()
+
+        def drawn():
+            g, form = suite_graph(n, multiplicity)
+            g.set_form(*form)
+            g.update_geometry()
+            return g
+        results['batched' if batching else 'unbatched'] = timed(drawn, view, repeat)
+    print('view_graph of {} ribs on Tcl: {:.3f}s unbatched, {:.3f}s batched'.format(n, results['unbatched'], results['batched']))
+    return results
+
+
+def save_results(results, filename):
+    with open(filename, 'w') as f:
+        json.dump({'python': sys.version.split()[0], 'results': results}, f, indent = 1, sort_keys = True)
+
+
+def compare(results, filename, tolerance = 1.5, noise = 0.001):
+    # regressions are results slower than tolerance times the baseline, times below noise seconds are ignored
+    with open(filename) as f:
+        baseline = json.load(f)['results']
+    regressions = []
+    for key in sorted(set(results) & set(baseline)):
+        old, new = baseline[key], results[key]
+        if new > old * tolerance and new > noise:
+            regressions.append((key, old, new))
+            print('{:<40} {:.4f}s -> {:.4f}s ({:.1f}x slower)'.format(key, old, new, new / old))
+    print('{} results compared, {} regressions'.format(len(set(results) & set(baseline)), len(regressions)))
+    return regressions
+
+
+def flatten(value):
+    if isinstance(value, (list, tuple)):
+        return [x for e in value for x in flatten(e)]
+    return [value]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--suite', action = 'store_true')
+    parser.add_argument('--sizes', type = int, nargs = '+', default = [10**3, 10**4])
+    parser.add_argument('--multiplicities', type = int, nargs = '+', default = [1, 8, 32])
+    parser.add_argument('--save')
+    parser.add_argument('--baseline', nargs = '?', const = BASELINE)
+    parser.add_argument('--tolerance', type = float, default = 1.5)
+    args = parser.parse_args()
+    if args.suite:
+        results = suite(args.sizes, args.multiplicities)
+        canvas_calls()
+        if args.save:
+            save_results(results, args.save)
+        if args.baseline and compare(results, args.baseline, args.tolerance):
+            sys.exit(1)
+        sys.exit(0)
+    bench_get_ribs()
+    soak_ribs()
+    bench_memory(DictGraph)
+    bench_memory(ArrayGraph)
+    bench_geometry()
+    bench_file()
+    bench_bulk_load()
+    bench_layout()
+    bench_generators()
+    bench_algorithms()
+    bench_batch()
+    bench_svg(DictGraph)
+    bench_svg(ArrayGraph)
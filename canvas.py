@@ -1,84 +1,460 @@
 from tkinter import *
+from graph import pair
+from render import Renderer, vertex_look, rib_look, weight_look, rib_line
+from contextlib import contextmanager
+import gc
 
 
-class GraphCanvas(Canvas):
+class GraphCanvas(Canvas, Renderer):
     '''
     GraphCanvas is special Canvas to display the graph in tkinter.
-    It uses data about the vertices and ribs from the object of class DictGraph.
+    It uses data about the vertices and ribs from the object of class DictGraph. It is Renderer (render module), what is drawn is told by vertex_look, rib_look and weight_look.
 
     Functions view_vertex, view_rib, view_rib_weight and delete_ribs need two parameters: the DictGraph object and vertex name or rib index.
     Functions delete_vertex, delete_rib, delete_rib_weight need only the identifier of vertex/rib.
-    view_graph function uses one parameter - DictGraph object.
+    view_graph function uses one parameter - DictGraph object. It redraws all, so it is used only when new graph is shown. clear_graph deletes all, clear_items deletes all items but remembers the graph.
+
+    GraphCanvas remembers canvas items of every vertex (self.vertex_items), rib (self.rib_items) and weight (self.weight_items).
+    view functions create items only the first time and later just change coordinates and options of existing items.
+    mark_vertex and mark_rib remember changed vertices and ribs, refresh redraws only them (or deletes them if they aren't in graph anymore).
+    refresh also redraws ribs which graph itself reports as changed (DictGraph.take_changed), for example parallel ribs after the deleted one.
+    Geometry of stale ribs is computed (DictGraph.update_geometry) right before they are drawn.
+
+    If self.culling is set or graph has more than self.culling_limit vertices and ribs, only the visible part of graph is drawn (view_visible). Spatial indexes of graph are used to find it.
+    It is redrawn after scrolling and resizing. If more than self.detail_limit vertices and ribs are visible, graph is drawn simplified:
+    vertices are dots, ribs are straight lines and weights aren't shown.
+
+    If self.bundling is set, families of multigraph with more than self.bundle_limit parallel ribs are drawn as one bundle: thick straight line with number of ribs
+    and sum of weights (self.bundle_items has pair of vertices as a key). expand and collapse show ribs of bundle separately and join them back, self.expanded stores expanded pairs.
+    Bundles are redrawn when any of their ribs is redrawn, every bundle only once during one view_graph, view_visible or refresh (self.bundles_drawn).
+    self.bundle_limit must not be less than 8, as smaller families aren't invalidated wholly by graph.
+
+    view_graph, view_visible and refresh create new items in batch (if self.batching is set): create_items doesn't call tkinter for every item,
+    but keeps arguments of Tcl create command and stores None in items dict, flush_batch passes them by chunks of self.batch_size to one Tcl call each (CREATE_ITEMS procedure)
+    and puts returned item ids into items dicts (self.batch_owners remembers where). Every item is created at most once during one pass, delete functions flush batch first,
+    so items are never deleted before they are created. Other changes (coords, itemconfigure) aren't batched, they are made only for existing items.
+    Batch is made by batched context: if drawing fails, commands which aren't passed yet are dropped with their None ids (so the next pass draws these items anew)
+    and garbage collector is enabled again. Batching saves Python and Tcl call overhead only, drawing itself takes most of the time (bench.bench_batch).
+
+    Every item has its own tag ('v:'+vertex name, 'rib'+index, 'weight'+index) and shared class tag: 'vertex' for vertex items, 'rib' for rib lines and weight texts,
+    'weight' for weight texts and 'bundle' for bundles. Window binds events only to class tags, once, and item_owner tells which vertex or rib the item belongs to.
+    Items are deleted and moved by ids from items dicts, not by tags, as Tk takes numeric tags for item ids and vertex names can be the same as class tags.
+
+    drag_start, drag_to and drag_stop show dragged vertex without graph changes. drag_start remembers drawn lines of its ribs and bundles (self.dragged),
+    drag_to moves vertex items and bends every line: its end at the vertex moves with it and other points move less the farther they are, weight texts move half way.
+    It is one coords call per line, so drag of vertex with hundreds of ribs is fast. Real geometry is computed once after drop by refresh.
 
     '''
     def __init__(self, master, *args, **kwargs):
         Canvas.__init__(self, master, *args, **kwargs)
+        self.setup()
+
+    def setup(self):
+        # state of GraphCanvas without tkinter widget, so stand-in canvases (bench.RecordingCanvas) can use it too
+        self.vertex_items = {}  # {'a': (oval, text), ...}
+        self.rib_items = {}
+        self.weight_items = {}
+        self.dirty_vertices = set()
+        self.dirty_ribs = set()
+
+        self.graph = None
+        self.culling = 0
+        self.culled = 0
+        self.culling_limit = 20000
+        self.detail_limit = 3000
+        self.simple = 0
+        self.pending = None
+        self.bundling = 0
+        self.bundle_limit = 8
+        self.bundle_items = {}  # {('a', 'b'): (line, text), ...}
+        self.expanded = set()
+        self.bundles_drawn = None
+        self.dragged = None
+        self.batching = 1
+        self.batch_size = 10000
+        self.batch = None  # arguments of create commands which aren't passed to Tcl yet, None if there is no batch
+        self.batch_owners = []  # (items dict, key, number of items, single) for every created vertex, rib, weight or bundle
+        self.batch_ready = 0  # CREATE_ITEMS is defined in Tcl
+        self.batch_gc = 0  # garbage collector was enabled before batch
+        self.bind('<Configure>', lambda ev: self.schedule_visible())
 
     def view_vertex(self, g, name):
-        x, y = g.form.get(name)[0], g.form.get(name)[1]
-        fill, outline = g.ver_colours.get(name)[0], g.ver_colours.get(name)[1]
-        size = g.ver_sizes.get(name)
-        self.create_oval(x-size, y-size, x+size, y+size, width = 3, fill = fill, outline = outline, tag = name)
-        self.create_text(x, y, text = name, fill = outline, tag = name)
+        x, y, size, fill, outline = vertex_look(g, name)
+        if self.simple:
+            size, fill = 2, outline
+        items = self.vertex_items.get(name)
+        if items:
+            self.coords(items[0], x-size, y-size, x+size, y+size)
+            self.itemconfigure(items[0], fill = fill, outline = outline)
+            if not self.simple:
+                self.coords(items[1], x, y)
+                self.itemconfigure(items[1], fill = outline)
+        elif self.simple:
+            self.create_items(self.vertex_items, name, [('oval', (x-size, y-size, x+size, y+size), dict(fill = fill, outline = outline, tags = ('v:' + name, 'vertex')))])
+        else:
+            self.create_items(self.vertex_items, name, [('oval', (x-size, y-size, x+size, y+size), dict(width = 3, fill = fill, outline = outline, tags = ('v:' + name, 'vertex'))),
+                                                        ('text', (x, y), dict(text = name, fill = outline, tags = ('v:' + name, 'vertex')))])
 
     def view_rib(self, g, i, col = 'black'):
         rib = g.ribs.get(i)
-        fill = g.rib_colours.get(i)
-        if not fill:
-            fill = col
-        arrow = None
-        if g.directed:
-            arrowset = rib[3]
-            if len(arrowset) == 2:
-                arrow = BOTH
-            elif rib[0] in arrowset:
-                arrow = FIRST
-            elif rib[1] in arrowset:
-                arrow = LAST
-
-        if g.multigraph:
-            points = g.rib_points.get(i)[g.rib_orientation.get(i)]
+        if self.bundling and g.multigraph:
+            key = pair(rib[0], rib[1])
+            if self.is_bundled(g, key):
+                self.delete_rib(i)
+                if self.bundles_drawn is None or key not in self.bundles_drawn:
+                    self.view_bundle(g, key)
+                return
+            if key in self.bundle_items:
+                self.delete_bundle(key)
+        points, fill, arrow = rib_look(g, i, col)
+        if self.simple:
+            points = [points[0], points[-1]]
+        coords = [c for point in points for c in point]
+        item = self.rib_items.get(i)
+        if item:
+            self.coords(item, *coords)
+            self.itemconfigure(item, arrow = arrow or NONE, fill = fill)
+        elif self.simple:
+            self.create_items(self.rib_items, i, [('line', coords, dict(arrow=arrow, width = 1, fill = fill, tags = ('rib'+str(i), 'rib')))], 1)
         else:
-            points = g.rib_points_simple.get(i)
-        self.create_line(*points, smooth='true', splinesteps=15, arrow=arrow, width = 3, fill = fill, tag = 'rib'+str(i))
+            self.create_items(self.rib_items, i, [('line', coords, dict(smooth='true', splinesteps=15, arrow=arrow, width = 3, fill = fill, tags = ('rib'+str(i), 'rib')))], 1)
 
     def view_rib_weight(self, g, i):
-        rib = g.ribs.get(i)
-        fill = g.weight_colours.get(i)
-        if g.multigraph:
-            layout = g.rib_text_layout.get(i)[g.rib_orientation.get(i)]
-        else:
-            layout = g.rib_text_layout_simple.get(i)[g.rib_orientation.get(i)]
-        if layout[0] < 0:
-            angle = layout[0] + 90
+        if self.simple or i not in self.rib_items:
+            return
+        x, y, angle, text, fill = weight_look(g, i)
+        item = self.weight_items.get(i)
+        if item:
+            self.coords(item, x, y)
+            self.itemconfigure(item, text = text, angle = angle, fill = fill)
         else:
-            angle = layout[0] - 90
-        self.create_text(layout[1], text = rib[2], angle = angle, tags = ['rib'+str(i), 'weight'+str(i)], font = ('TkDefaultFont', 11), fill = fill)
+            self.create_items(self.weight_items, i, [('text', (x, y), dict(text = text, angle = angle, tags = ['rib'+str(i), 'weight'+str(i), 'rib', 'weight'], font = ('TkDefaultFont', 11), fill = fill))], 1)
 
     def view_graph(self, g):
-        self.delete('all')
-        for e in g.vertices.keys():
-            self.view_vertex(g, e)
-        for e in g.ribs.keys():
-            self.view_rib(g, e)
-        if g.weighted:
+        self.clear_graph()
+        self.graph = g
+        g.update_geometry()
+        g.take_changed()  # everything is drawn anew
+        self.culled = self.culling or len(g.vertices) + len(g.ribs) > self.culling_limit
+        if self.culled:
+            self.view_visible()
+            return
+        self.bundles_drawn = set()
+        with self.batched():
+            for e in g.vertices.keys():
+                self.view_vertex(g, e)
             for e in g.ribs.keys():
-                self.view_rib_weight(g, e)
+                self.view_rib(g, e)
+            if g.weighted:
+                for e in g.ribs.keys():
+                    self.view_rib_weight(g, e)
+        self.bundles_drawn = None
+
+    def is_bundled(self, g, key):
+        return self.bundling and g.multigraph and key not in self.expanded and len(g.pairs.get(key, ())) > self.bundle_limit
+
+    def view_bundle(self, g, key):
+        # bundle is drawn along the straight line of its first rib
+        family = g.pairs.get(key)
+        first = next(iter(family))
+        if first in g.stale:
+            g.update_geometry([first])
+        points = g.rib_points_simple.get(first)
+        coords = [points[0][0], points[0][1], points[-1][0], points[-1][1]]
+        fill = g.rib_colours.get(first) or 'black'
+        label = '×{}'.format(len(family))
+        if g.weighted:
+            label += ' Σ{}'.format(sum(g.ribs.get(i)[2] for i in family))
+        items = self.bundle_items.get(key)
+        if items:
+            self.coords(items[0], *coords)
+            self.itemconfigure(items[0], fill = fill)
+            self.coords(items[1], *g.rib_points_simple.get(first)[1])
+            self.itemconfigure(items[1], text = label)
+        else:
+            self.create_items(self.bundle_items, key, [('line', coords, dict(width = 7, fill = fill, tag = 'bundle')),
+                                                       ('text', g.rib_points_simple.get(first)[1], dict(text = label, font = ('TkDefaultFont', 11), fill = fill, tag = 'bundle'))])
+        if self.bundles_drawn is not None:
+            self.bundles_drawn.add(key)
+
+    def bundle_at(self, item):
+        # pair of vertices of the bundle which item belongs to, or None
+        for key, items in self.bundle_items.items():
+            if item in items:
+                return key
+
+    def expand(self, g, key):
+        self.expanded.add(key)
+        self.delete_bundle(key)
+        for i in g.pairs.get(key, ()):
+            self.mark_rib(i)
+        self.refresh(g)
+
+    def collapse(self, g, key):
+        self.expanded.discard(key)
+        for i in g.pairs.get(key, ()):
+            self.mark_rib(i)
+        self.refresh(g)
+
+    def view_visible(self):
+        # draws vertices and ribs intersecting the visible region and deletes others
+        self.pending = None
+        g = self.graph
+        if not g or not self.culled:
+            return
+        g.update_geometry()
+        self.bundles_drawn = set()
+        region = self.view_region()
+        x1, y1, x2, y2 = region
+        # vertex_grid stores centres, vertices can't be bigger than 100
+        vertices = [name for name in g.vertex_grid.query(x1 - 100, y1 - 100, x2 + 100, y2 + 100) if vertex_visible(g, name, region)]
+        ribs = [i for i in g.rib_grid.query(*region) if rib_visible(g, i, region)]
+        simple = len(vertices) + len(ribs) > self.detail_limit
+        if simple != self.simple:
+            self.clear_items()
+            self.simple = simple
+        for name in set(self.vertex_items).difference(vertices):
+            self.delete_vertex(name)
+        for i in set(self.rib_items).difference(ribs):
+            self.delete_rib(i)
+        with self.batched():
+            for name in vertices:
+                if name not in self.vertex_items:
+                    self.view_vertex(g, name)
+            for i in ribs:
+                if i not in self.rib_items:
+                    self.view_rib(g, i)
+                    if g.weighted:
+                        self.view_rib_weight(g, i)
+        for key in set(self.bundle_items).difference(self.bundles_drawn):
+            self.delete_bundle(key)
+        self.bundles_drawn = None
+
+    def view_region(self):
+        return self.canvasx(0), self.canvasy(0), self.canvasx(self.winfo_width()), self.canvasy(self.winfo_height())
+
+    def schedule_visible(self):
+        # many scroll events are joined in one redraw
+        if self.culled and not self.pending:
+            self.pending = self.after_idle(self.view_visible)
+
+    def xview(self, *args):
+        result = Canvas.xview(self, *args)
+        if args:
+            self.schedule_visible()
+        return result
+
+    def yview(self, *args):
+        result = Canvas.yview(self, *args)
+        if args:
+            self.schedule_visible()
+        return result
+
+    def clear_graph(self):
+        self.clear_items()
+        self.graph = None
+        self.culled = 0
+        self.simple = 0
+
+    def clear_items(self):
+        self.delete('all')
+        self.vertex_items = {}
+        self.rib_items = {}
+        self.weight_items = {}
+        self.bundle_items = {}
+        self.dirty_vertices = set()
+        self.dirty_ribs = set()
+
+    def mark_vertex(self, name):
+        self.dirty_vertices.add(name)
+
+    def mark_rib(self, i):
+        self.dirty_ribs.add(i)
+
+    def refresh(self, g):
+        self.dirty_ribs.update(g.take_changed())
+        g.update_geometry([i for i in self.dirty_ribs if i in g.stale])
+        region = self.view_region() if self.culled else None
+        self.bundles_drawn = set()
+        with self.batched():
+            for name in self.dirty_vertices:
+                if name in g.vertices and (not region or vertex_visible(g, name, region)):
+                    self.view_vertex(g, name)
+                else:
+                    self.delete_vertex(name)
+            for i in self.dirty_ribs:
+                if i in g.ribs and (not region or rib_visible(g, i, region)):
+                    self.view_rib(g, i)
+                    if g.weighted:
+                        self.view_rib_weight(g, i)
+                else:
+                    self.delete_rib(i)
+        for key in list(self.bundle_items):
+            if len(g.pairs.get(key, ())) <= self.bundle_limit:
+                self.delete_bundle(key)  # the whole family is deleted or has become small
+        self.bundles_drawn = None
+        self.dirty_vertices = set()
+        self.dirty_ribs = set()
+
+    def drag_start(self, g, name):
+        x, y = g.form.get(name)[0], g.form.get(name)[1]
+        items = [(self.rib_items.get(i), self.weight_items.get(i)) for i in g.vertices.get(name)]
+        keys = {pair(g.ribs.get(i)[0], g.ribs.get(i)[1]) for i in g.vertices.get(name)}
+        items += [self.bundle_items.get(key) for key in keys if key in self.bundle_items]
+        lines, texts = [], []
+        for line, text in items:
+            if line is None:
+                continue  # rib isn't drawn (culling or bundle)
+            coords = self.coords(line)
+            n = len(coords) // 2
+            head = (coords[0] - x) ** 2 + (coords[1] - y) ** 2
+            tail = (coords[-2] - x) ** 2 + (coords[-1] - y) ** 2
+            if head < tail:
+                parts = [1 - k / (n - 1) for k in range(n)]
+            else:
+                parts = [k / (n - 1) for k in range(n)]
+            lines.append((line, coords, parts))
+            if text:
+                texts.append(text)
+        self.dragged = [name, x, y, lines, texts, 0, 0]
+
+    def drag_to(self, x, y):
+        name, x0, y0, lines, texts, shown_x, shown_y = self.dragged
+        dx, dy = x - x0, y - y0
+        mx, my = dx - shown_x, dy - shown_y  # canvas.move is relative to the last drawn place
+        for item in self.vertex_items.get(name) or ():
+            self.move(item, mx, my)
+        for line, coords, parts in lines:
+            self.coords(line, *[c + (dy if k % 2 else dx) * parts[k // 2] for k, c in enumerate(coords)])
+        for text in texts:
+            self.move(text, mx / 2, my / 2)
+        self.dragged[5:] = dx, dy
+
+    def drag_stop(self):
+        self.dragged = None
 
     def delete_vertex(self, name):
-        self.delete(name)
+        self.flush_batch()
+        items = self.vertex_items.pop(name, None)
+        if items:
+            self.delete(*items)
 
     def delete_rib(self, i):
-        self.delete('rib'+str(i))
+        self.flush_batch()
+        items = [item for item in (self.rib_items.pop(i, None), self.weight_items.pop(i, None)) if item]
+        if items:
+            self.delete(*items)
+
+    def create_items(self, items, key, specs, single = 0):
+        # specs are (kind, flat coordinates, options) of items of one vertex, rib, weight or bundle, single item is stored without tuple
+        if self.batch is None:
+            created = [getattr(self, 'create_' + kind)(*coords, **options) for kind, coords, options in specs]
+            items[key] = created[0] if single else tuple(created)
+            return
+        self.batch.extend(self.item_command(kind, coords, options) for kind, coords, options in specs)
+        self.batch_owners.append((items, key, len(specs), single))
+        items[key] = None  # key is known at once, item id is put by flush_batch
+        if len(self.batch) >= self.batch_size:
+            self.flush_batch()
+
+    def item_command(self, kind, coords, options):
+        # arguments of canvas create command, tkinter converts tuples to Tcl lists itself, so nothing is quoted here
+        words = [kind, *coords]
+        for option, value in options.items():
+            if value is not None:  # the same as tkinter, None options aren't passed
+                words.extend(('-' + option, tuple(value) if isinstance(value, list) else value))
+        return tuple(words)
+
+    @contextmanager
+    def batched(self):
+        # nested batched doesn't start new batch
+        if self.batch is not None or not self.batching:
+            yield
+            return
+        self.batch = []
+        self.batch_owners = []
+        self.batch_gc = gc.isenabled()
+        gc.disable()  # batch keeps many small tuples, garbage collector passes over them only slow it down
+        try:
+            yield
+            self.flush_batch()
+        finally:
+            for items, key, count, single in self.batch_owners:
+                if key in items and items[key] is None:
+                    del items[key]  # not created
+            self.batch = None
+            self.batch_owners = []
+            if self.batch_gc:
+                gc.enable()
+
+    def flush_batch(self):
+        if not self.batch:
+            return
+        ids = self.run_batch(self.batch)  # if Tcl fails, batch is left for batched to drop
+        owners = self.batch_owners
+        self.batch, self.batch_owners = [], []
+        k = 0
+        for items, key, count, single in owners:
+            if key in items:
+                items[key] = ids[k] if single else tuple(ids[k:k+count])
+            k += count
+
+    def run_batch(self, commands):
+        if not self.batch_ready:
+            self.tk.eval(CREATE_ITEMS)
+            self.batch_ready = 1
+        return [int(e) for e in self.tk.splitlist(self.tk.call('graphcanvas_create', self._w, tuple(commands)))]
+
+    def item_owner(self, item = 'current'):
+        # vertex name or rib index of canvas item (item under the mouse by default), None for other items
+        tags = self.gettags(item)
+        if 'vertex' in tags:
+            return tags[0][2:]
+        if 'rib' in tags:
+            return int(tags[0][3:])
+        return None
 
     def delete_ribs(self, g, ver1):
         l = g.vertices.get(ver1)
         for i in l:
-            self.delete('rib'+str(i))
+            self.delete_rib(i)
+
+    def delete_bundle(self, key):
+        self.flush_batch()
+        for item in self.bundle_items.pop(key, ()):
+            self.delete(item)
 
     def delete_rib_weight(self, i):
-        self.delete('weight'+str(i))
+        self.flush_batch()
+        item = self.weight_items.pop(i, None)
+        if item:
+            self.delete(item)
+
+
+# creates canvas items from list of create commands arguments and returns their ids
+CREATE_ITEMS = '''
+proc graphcanvas_create {canvas commands} {
+    set ids {}
+    foreach command $commands {
+        lappend ids [$canvas create {*}$command]
+    }
+    return $ids
+}
+'''
+
+
+def vertex_visible(g, name, region):
+    x, y = g.form.get(name)[0], g.form.get(name)[1]
+    size = g.ver_sizes.get(name)
+    return region[0] <= x + size and x - size <= region[2] and region[1] <= y + size and y - size <= region[3]
+
 
+def rib_visible(g, i, region):
+    # spline lies inside bounding box of its points
+    points = rib_line(g, i)
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return region[0] <= max(xs) and min(xs) <= region[2] and region[1] <= max(ys) and min(ys) <= region[3]
 
 
 if __name__ == '__main__':
@@ -0,0 +1,87 @@
+from array import array
+
+
+class Snapshot():
+    '''
+    Snapshot is compressed sparse row (CSR) copy of graph adjacency, algorithms module works with it instead of graph dicts.
+    self.names is list of vertex names (vertex numbers are their places in sorted order), self.index translates names to numbers.
+    Arcs going out of vertex v are at places self.offsets[v] ... self.offsets[v+1]-1 of parallel arrays:
+    self.targets stores numbers of other vertices, self.ribs stores rib indexes, self.weights stores weights (1 for unweighted graph),
+    self.dirs stores direction masks from the point of view of the arc (1 - arrow at v, 2 - arrow at the target).
+    If self.directed is set, arc from v to u exists only if rib can be passed in that direction: it has arrow at u or has no arrows at all.
+    Otherwise every rib gives arcs in both directions. Loop gives only one arc. Parallel ribs give separate arcs.
+    self.rib_count is number of ribs in snapshot, self.version is version of graph (DictGraph.version) when snapshot was made.
+    self.weighted and self.arrows are weighted and directed flags of graph, so algorithms can work with snapshot without graph (undirected snapshot of directed graph keeps its arrows in self.dirs).
+
+    dense returns adjacency matrix as list of rows (float arrays), sparse returns scipy.sparse.csr_matrix made from the same arrays without copying the graph again.
+    Both sum weights of parallel ribs. scipy isn't needed for anything else, so it is imported only by sparse.
+    '''
+    def __init__(self, g, directed = None):
+        if directed is None:
+            directed = g.directed
+        self.directed = directed
+        self.weighted, self.arrows = g.weighted, g.directed
+        self.version = getattr(g, 'version', None)  # taken before reading, so changes made during building aren't missed
+        self.names = sorted(g.vertices)
+        self.index = {name: v for v, name in enumerate(self.names)}
+        n = len(self.names)
+        self.rib_count = len(g.ribs)
+
+        # two passes over ribs: arcs are counted, then written to their places, so no list of all arcs is kept
+        offsets = array('l', [0]) * (n + 1)
+        for v, u, i, w, mask in self.graph_arcs(g):
+            offsets[v + 1] += 1
+        for v in range(n):
+            offsets[v + 1] += offsets[v]
+        place = array('l', offsets)
+        m = offsets[n]
+        self.targets = array('l', [0]) * m
+        self.ribs = array('l', [0]) * m
+        self.weights = array('d', bytes(8 * m))
+        self.dirs = array('B', bytes(m))
+        for v, u, i, w, mask in self.graph_arcs(g):
+            p = place[v]
+            place[v] += 1
+            self.targets[p] = u
+            self.ribs[p] = i
+            self.weights[p] = w
+            self.dirs[p] = mask
+        self.offsets = offsets
+
+    def graph_arcs(self, g):
+        # (v, u, rib, weight, mask) for every arc of graph
+        index, directed, weighted = self.index, self.directed, g.weighted
+        for i, rib in g.ribs.items():
+            a, b, dir = rib[0], rib[1], rib[3]
+            w = rib[2] if weighted else 1
+            va, vb = index[a], index[b]
+            to_a, to_b = a in dir, b in dir
+            if not directed or to_b or not dir:
+                yield va, vb, i, w, to_a | to_b << 1
+            if a != b and (not directed or to_a or not dir):
+                yield vb, va, i, w, to_b | to_a << 1
+
+    def __len__(self):
+        return len(self.names)
+
+    def arcs(self, v):
+        # places of arcs of vertex v
+        return range(self.offsets[v], self.offsets[v + 1])
+
+    def dense(self):
+        # n*n floats, only for small graphs
+        n = len(self)
+        rows = []
+        for v in range(n):
+            row = array('d', bytes(8 * n))
+            for p in self.arcs(v):
+                row[self.targets[p]] += self.weights[p]
+            rows.append(row)
+        return rows
+
+    def sparse(self):
+        from scipy.sparse import csr_matrix
+        n = len(self)
+        matrix = csr_matrix((self.weights, self.targets, self.offsets), shape = (n, n))
+        matrix.sum_duplicates()
+        return matrix
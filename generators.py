@@ -0,0 +1,244 @@
+'''
+Generators of random and regular graphs of any size.
+
+letters returns k-th name of unbounded sequence A, B, ..., Z, AA, AB, ..., names returns first n of them. NameAllocator gives names of this sequence to new vertices one by one.
+Vertex placement: grid_form puts vertices on jittered square grid, poisson_form places them by Poisson disk sampling (Bridson algorithm) with background grid.
+Both take linear time and make the plane as big as it is needed, vertices are never closer than step/2 or radius, so rib geometry can be computed.
+Models: gnm (Erdos-Renyi G(n, m)), barabasi_albert (preferential attachment, every new vertex gets k ribs), grid_graph (w x h lattice) and tree (random recursive or k-ary tree).
+Every model takes seed for repeatable graphs, weighted, directed, placement ('grid' or 'poisson') and cls (DictGraph by default).
+Ribs are collected in list and added by one set_ribs call, duplicate ribs of simple graphs are checked by set of pairs, so graphs are built in linear time.
+Rib geometry isn't computed, it is lazy.
+
+'''
+
+from math import sqrt, pi, sin, cos
+import gc
+import random
+from graph import DictGraph
+
+
+def letters(k):
+    name = ''
+    k += 1
+    while k:
+        k, r = divmod(k - 1, 26)
+        name = chr(65 + r) + name
+    return name
+
+
+def names(n):
+    return [letters(k) for k in range(n)]
+
+
+class NameAllocator():
+    '''
+    NameAllocator gives new vertex names from letters sequence and reuses released names. self.used is set of names of graph vertices,
+    self.free is dict (used as ordered set) of released names, self.next is number of the next new name in letters sequence.
+    take returns free name (the last released one first), use and release tell allocator that name is taken or released by other way (renaming).
+    All of them take constant time, only creating allocator for existing graph takes linear time.
+    '''
+    def __init__(self, used = ()):
+        self.used = set(used)
+        self.free = {}
+        self.next = 0
+
+    def take(self):
+        if self.free:
+            name = self.free.popitem()[0]
+        else:
+            name = letters(self.next)
+            while name in self.used:
+                self.next += 1
+                name = letters(self.next)
+            self.next += 1
+            self.free.pop(name, None)  # renamed vertex could have this name and be deleted
+        self.used.add(name)
+        return name
+
+    def use(self, name):
+        self.used.add(name)
+        self.free.pop(name, None)
+
+    def release(self, name):
+        self.used.discard(name)
+        self.free[name] = None
+
+
+def grid_form(n, step = 80, jitter = 0.25, rand = random):
+    # jitter is part of step, so vertices are at least step*(1 - 2*jitter) apart
+    side = max(1, int(sqrt(n) + 0.999))
+    shift = step * jitter
+    return [[step//2 + shift + step * (k % side) + rand.uniform(-shift, shift),
+             step//2 + shift + step * (k // side) + rand.uniform(-shift, shift)] for k in range(n)]
+
+
+def poisson_form(n, radius = 50, rand = random, tries = 10):
+    # points are at least radius apart, square is made bigger until n points fit in it
+    side = radius * sqrt(n * 2.2) + radius  # about 70% of the densest filling, so sampling ends early
+    while True:
+        points = poisson_points(side, radius, n, rand, tries)
+        if len(points) == n:
+            return [[x + radius, y + radius] for x, y in points]
+        side *= 1.2
+
+
+def poisson_points(side, radius, n, rand, tries):
+    cell = radius / sqrt(2)  # every cell contains at most one point
+    width = int(side // cell) + 1
+    cells = [-1] * (width * width)  # point number in every cell of flat grid
+    # neighbour cells which can contain points closer than radius, nearest cells are checked first
+    near = sorted([(i, j) for i in range(-2, 3) for j in range(-2, 3) if abs(i) + abs(j) < 4], key = lambda e: abs(e[0]) + abs(e[1]))
+    near = [j * width + i for i, j in near]
+    xs, ys = [], []
+    active = []
+    rr = radius * radius
+
+    def add(x, y):
+        cells[int(y // cell) * width + int(x // cell)] = len(xs)
+        active.append(len(xs))
+        xs.append(x)
+        ys.append(y)
+
+    add(rand.random() * side, rand.random() * side)
+    while active and len(xs) < n:
+        a = len(active) - 1  # the newest point, it is on the border, so new points are found faster
+        x, y = xs[active[a]], ys[active[a]]
+        for _ in range(tries):
+            r = radius * (1 + rand.random())
+            angle = 2 * pi * rand.random()
+            px, py = x + r * cos(angle), y + r * sin(angle)
+            if not (0 <= px < side and 0 <= py < side):
+                continue
+            c = int(py // cell) * width + int(px // cell)
+            for d in near:
+                k = cells[c + d] if 0 <= c + d < len(cells) else -1
+                if k != -1 and (xs[k] - px) ** 2 + (ys[k] - py) ** 2 < rr:
+                    break
+            else:
+                add(px, py)
+                break
+        else:
+            active[a] = active[-1]
+            active.pop()
+    return list(zip(xs, ys))
+
+
+def without_gc(func):
+    # millions of small lists and sets are created, garbage collector passes only slow it down
+    def wrapper(*args, **kwargs):
+        collect = gc.isenabled()
+        gc.disable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if collect:
+                gc.enable()
+    wrapper.__name__, wrapper.__doc__ = func.__name__, func.__doc__
+    return wrapper
+
+
+def new_graph(n, cls, placement, rand):
+    vertex_names = names(n)
+    g = cls(*vertex_names)
+    if placement == 'poisson':
+        place(g, vertex_names, poisson_form(n, rand = rand))
+    else:
+        place(g, vertex_names, grid_form(n, rand = rand))
+    return g, vertex_names
+
+
+def place(g, vertex_names, form):
+    # form is given in order of vertex_names, set_form needs sorted names. It is set before ribs are added, so set_form doesn't invalidate them
+    form = dict(zip(vertex_names, form))
+    g.set_form(*[form.get(name) for name in sorted(g.vertices)])
+
+
+def rib(a, b, weighted, directed, rand):
+    return a, b, 1 + int(rand.random() * 99) if weighted else 1, {b} if directed else set()
+
+
+@without_gc
+def gnm(n, m, multigraph = 0, weighted = 0, directed = 0, seed = None, placement = 'grid', cls = DictGraph):
+    # m ribs between random pairs of n vertices, without loops, without parallel ribs unless multigraph
+    assert n >= 2 or not m, 'ribs need at least two vertices'  # loops aren't made, so ribs of one vertex would be searched for ever
+    assert multigraph or m <= n * (n - 1) // 2, 'too many ribs for simple graph'
+    rand = random.Random(seed)
+    g, vertex_names = new_graph(n, cls, placement, rand)
+    g.weighted, g.directed, g.multigraph = weighted, directed, multigraph
+    ribs = []
+    pairs = set()
+    while len(ribs) < m:
+        u, v = int(rand.random() * n), int(rand.random() * n)
+        if u == v:
+            continue
+        if not multigraph:
+            key = (u, v) if u < v else (v, u)
+            if key in pairs:
+                continue
+            pairs.add(key)
+        ribs.append(rib(vertex_names[u], vertex_names[v], weighted, directed, rand))
+    g.set_ribs(ribs)
+    return g
+
+
+@without_gc
+def barabasi_albert(n, k = 2, weighted = 0, directed = 0, seed = None, placement = 'grid', cls = DictGraph):
+    # every new vertex is connected to k different old ones with probability proportional to their degrees
+    assert 1 <= k < n, 'k must be between 1 and n-1'
+    rand = random.Random(seed)
+    g, vertex_names = new_graph(n, cls, placement, rand)
+    g.weighted, g.directed = weighted, directed
+    ribs = []
+    ends = []  # every vertex is repeated here as many times as its degree
+    for v in range(1, k + 1):  # the first k+1 vertices make a star
+        ribs.append(rib(vertex_names[v], vertex_names[0], weighted, directed, rand))
+        ends.extend((v, 0))
+    for v in range(k + 1, n):
+        targets = set()
+        while len(targets) < k:
+            targets.add(ends[int(rand.random() * len(ends))])
+        for u in targets:
+            ribs.append(rib(vertex_names[v], vertex_names[u], weighted, directed, rand))
+            ends.extend((v, u))
+    g.set_ribs(ribs)
+    return g
+
+
+@without_gc
+def grid_graph(w, h, step = 80, weighted = 0, directed = 0, seed = None, cls = DictGraph):
+    # lattice of w x h vertices, every vertex is connected with right and bottom neighbours
+    rand = random.Random(seed)
+    vertex_names = names(w * h)
+    g = cls(*vertex_names)
+    place(g, vertex_names, [[step//2 + step * (v % w), step//2 + step * (v // w)] for v in range(w * h)])
+    g.weighted, g.directed = weighted, directed
+    ribs = []
+    for y in range(h):
+        for x in range(w):
+            v = y * w + x
+            if x + 1 < w:
+                ribs.append(rib(vertex_names[v], vertex_names[v + 1], weighted, directed, rand))
+            if y + 1 < h:
+                ribs.append(rib(vertex_names[v], vertex_names[v + w], weighted, directed, rand))
+    g.set_ribs(ribs)
+    return g
+
+
+@without_gc
+def tree(n, branching = 0, weighted = 0, directed = 0, seed = None, placement = 'grid', cls = DictGraph):
+    # random recursive tree (parent of every vertex is random older vertex) or complete tree with given branching
+    rand = random.Random(seed)
+    g, vertex_names = new_graph(n, cls, placement, rand)
+    g.weighted, g.directed = weighted, directed
+    ribs = []
+    for v in range(1, n):
+        parent = (v - 1) // branching if branching else int(rand.random() * v)
+        ribs.append(rib(vertex_names[parent], vertex_names[v], weighted, directed, rand))
+    g.set_ribs(ribs)
+    return g
+
+
+if __name__ == '__main__':
+    g = gnm(10, 15, seed = 1)
+    g.view()
+    print(names(30))
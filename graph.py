@@ -1,12 +1,16 @@
 from math import sqrt, atan2, degrees
+from spatial import GridIndex, segment_distance, spline_points
+from csr import Snapshot
+import algorithms
+import gc
 
 
 class Graph():
     def is_tree(self):
-        pass
+        return algorithms.is_tree(self)
 
     def is_oil(self):
-        pass
+        return algorithms.is_oil(self)
 
     def set_vertices(self, *args):
         pass
@@ -26,7 +30,7 @@ class DictGraph(Graph):
 
     This class is one of different implementations of graph which uses python dictionaries. Other implementations wasn't include in this module (matrix graph and so forth).
     DictGraph object stores information about graph.
-    Vertices store in dict self.vertices and have string name as a key and rib indexes array as a value.
+    Vertices store in dict self.vertices and have string name as a key and rib indexes as a value. Rib indexes are stored in dict with None values which is used as ordered set, so removing of rib doesn't depend on vertex degree.
     Ribs store in dict self.ribs and have int index as a key. Value is a list that contains two vertices, weight and set of directions which contains vertex names.
     self.form is dict with x and y coordinates for each vertex. self.sizes stores roughly vertex radius. (half the diagonal of the square into which the circle is inscribed, to be more precise)
     self.ver_colours stores two colours for each vertex as a tuple and self.rib_colours, self.weight_colours store separately colours for ribs. Colours are stored in hex.
@@ -34,17 +38,42 @@ class DictGraph(Graph):
 
     set_vertices function allow arbitrary quantity of string names and creates such vertices. Nothing returns.
     set_rib need two string vertex names as required parameters. Int weight and set dir are optional parameters. It returns rib index.
+    set_ribs does the same for many ribs (a, b, w, dir) at once and returns range of their indexes, it is used by generators and loaders.
+    restore_rib puts deleted rib back with its old index and on its old place in the family, so undo and redo (history module) can refer to ribs by index.
     set_form requires lists or tuples with two int elements for x and y coordinates. Number of args must correspond to the number of vertices of this graph.
-    del_rib and del_vertex need int index or string name accordingly.
+    del_rib and del_vertex need int index or string name accordingly. del_rib clears all dictionaries with rib information.
     rename_vertex require two string parameters one of them is existing vertex and other isn't.
-    get_ribs returns int list for all rib indexes between two vertices.
+    get_ribs returns int list for all rib indexes between two vertices. It uses self.pairs index, so it doesn't depend on vertex degrees.
+    rib_count and has_rib answer how many ribs (and if any) connect two vertices in constant time.
     view prints information about graph, without some things about visual display on canvas.
+    is_tree and is_oil (Euler cycle) are computed by algorithms module, which also has traversals, components, shortest paths and spanning trees.
     find_points_for_rib and find_text_layout are auxiliary functions for correct positioning ribs have on the canvas.
+    find_geometry does the same for many ribs at once (all ribs by default).
+
+    Geometry is lazy: set_rib doesn't compute it, but adds rib index to self.stale (dict used as ordered set). Ribs of moved, resized or renamed vertices
+    and all ribs after set_form are added there too. Geometry values of stale ribs are outdated or absent.
+    Rib orientation and curvature depend on its place in the family (self.pairs), so del_rib invalidates only the ribs after the deleted one, ribs before it keep their geometry.
+    Families with more than 2*len(CURVATURE) ribs are spread evenly over the curvature table (bundle_level), so their curvature depends on the family size and they are invalidated wholly.
+    update_geometry computes geometry of all stale ribs (or only of given ones) with find_geometry. GraphCanvas calls it before drawing, other callers must call it too.
+    invalidate adds ribs to self.stale and to self.changed. self.changed remembers ribs whose drawing is outdated even if their geometry is already recomputed,
+    take_changed returns them and starts new set, so GraphCanvas.refresh redraws exactly the ribs changed since the last refresh.
+    forget_geometry drops geometry of ribs and makes them stale again, so renderers which draw graph to file (render.Renderer) don't keep geometry of all ribs.
+    self.invalidations counts invalidate calls, so geometry computed in background for a copy of graph (worker.geometry_copy) is known to be outdated.
+
+    self.version counts changes of vertices, ribs and weights made by methods of graph (touch adds one), reweigh_rib changes weight of rib.
+    snapshot returns compressed sparse row copy of the graph (csr.Snapshot with index map, offsets, neighbours, rib indexes, weights, direction masks and adjacency matrices).
+    Snapshots are cached in self.snapshots for both directed and undirected traversal and are rebuilt only when self.version or weighted flag has changed.
+    Direct changes of self.ribs or self.vertices must be followed by touch, otherwise old snapshot is returned.
+
+    self.vertex_grid and self.rib_grid are spatial indexes (GridIndex) for vertex centres and for cells which drawn rib lines pass through. They are updated by set_form, move_vertex and rib geometry functions.
+    move_vertex and resize_vertex set new coordinates or size of vertex, they must be used instead of changing self.form and self.ver_sizes directly.
+    find_vertex returns vertex which centre is in the square with given centre and half side, or 0. It is used for clicks and to check if place is occupied.
+    find_rib returns the nearest rib (to its line as it is drawn, or its weight) within radius, or 0. Curved ribs are measured to points of their spline (spatial.spline_points).
 
     '''
 
     def __init__(self, *args):
-        self.vertices = {e: [] for e in args} #
+        self.vertices = {e: {} for e in args} # {'a': {1: None, 2: None}, ...}
         self.ribs = {}  # {1: ['a', 'b', w, dir], 2: [], ...} # {{'a', 'b'}: [[5,{}], [6,{'b'}]}
         self.form = {}
         self.ver_colours = {e: ('white', 'black') for e in args}
@@ -56,7 +85,15 @@ class DictGraph(Graph):
         self.rib_orientation = {}
         self.rib_text_layout = {}
         self.rib_text_layout_simple = {}
+        self.pairs = {}  # {('a', 'b'): {5: None, 6: None}, ...} rib indexes between two vertices, key is sorted
+        self.vertex_grid = GridIndex()
+        self.rib_grid = GridIndex(250)  # ribs are longer than vertices, so cells are bigger
+        self.stale = {}
+        self.changed = {}
+        self.invalidations = 0
         self.next_rib = 1
+        self.version = 0
+        self.snapshots = {}
 
         self.directed = 0
         self.weighted = 0
@@ -67,11 +104,95 @@ class DictGraph(Graph):
         x = [e for e in self.vertices.keys()]
         x.sort()
         self.form = {x[i]: args[i] for i in range(len(x))}
+        self.vertex_grid.clear()
+        for name, coor in self.form.items():
+            self.vertex_grid.insert(name, *coor, *coor)
+        self.invalidate(self.ribs)
+
+    def move_vertex(self, name, coor):
+        self.form[name] = coor
+        self.vertex_grid.insert(name, *coor, *coor)
+        self.invalidate(self.vertices.get(name))
+
+    def resize_vertex(self, name, size):
+        self.ver_sizes[name] = size
+        self.invalidate(self.vertices.get(name))
+
+    def invalidate(self, ribs):
+        self.invalidations += 1
+        self.stale.update(dict.fromkeys(ribs))
+        self.changed.update(dict.fromkeys(ribs))
+
+    def forget_geometry(self, ribs):
+        for column in [self.rib_points, self.rib_points_simple, self.rib_orientation, self.rib_text_layout, self.rib_text_layout_simple]:
+            for i in ribs:
+                column.pop(i, None)
+        for i in ribs:
+            self.rib_grid.remove(i)
+        self.stale.update(dict.fromkeys(ribs))
+
+    def take_changed(self):
+        changed = self.changed
+        self.changed = {}
+        return changed
+
+    def touch(self):
+        self.version += 1
+
+    def snapshot(self, directed = None):
+        # snapshot is shared by all callers, so its arrays mustn't be changed
+        if directed is None:
+            directed = self.directed
+        key = (bool(directed), bool(self.weighted))
+        s = self.snapshots.get(key)
+        if s is None or s.version != self.version:
+            s = self.snapshots[key] = Snapshot(self, directed)
+        return s
+
+    def update_geometry(self, ribs = None):
+        if ribs is None:
+            ribs = list(self.stale)
+        else:
+            ribs = [i for i in ribs if i in self.stale]
+        if ribs and self.form:
+            self.find_geometry(ribs)
+
+    def find_vertex(self, x, y, size):
+        n, best = 0, None
+        for name in self.vertex_grid.query(x - size, y - size, x + size, y + size):
+            coor = self.form.get(name)
+            if abs(coor[0] - x) <= size and abs(coor[1] - y) <= size:
+                d = distance(x, y, *coor)
+                if best is None or d < best:
+                    n, best = name, d
+        return n
+
+    def find_rib(self, x, y, radius = 20):
+        self.update_geometry()
+        n, best = 0, radius
+        for i in self.rib_grid.query(x - radius, y - radius, x + radius, y + radius):
+            if self.multigraph:
+                points = spline_points(self.rib_points.get(i)[self.rib_orientation.get(i)], 16)
+                text = self.rib_text_layout.get(i)[self.rib_orientation.get(i)][1]
+            else:
+                points = self.rib_points_simple.get(i)
+                text = points[1]
+            d = min([distance(x, y, *text)] + [segment_distance(x, y, *points[k], *points[k+1]) for k in range(len(points) - 1)])
+            if d <= best:
+                n, best = i, d
+        return n
+
+    def index_rib(self, i):
+        # rib is stored in cells which its drawn lines and weight pass through, not in cells of its bounding box, so long ribs take few cells.
+        # Spline can be far from its control points, so its points are indexed
+        o = self.rib_orientation.get(i)
+        self.rib_grid.insert_lines(i, [spline_points(self.rib_points.get(i)[o]), self.rib_points_simple.get(i), [self.rib_text_layout.get(i)[o][1]]])
 
     def set_vertices(self, *args):
         for n in args:
             assert self.vertices.get(n) == None, 'name is already used'
-            self.vertices[n] = []
+            self.vertices[n] = {}
+        self.touch()
 
     def set_rib(self, a, b, w=1, dir=set()):
         i = self.next_rib
@@ -79,12 +200,18 @@ class DictGraph(Graph):
         self.ribs[i] = [a, b, w, dir]
         x = self.vertices.get(a)
         y = self.vertices.get(b)
-        x.append(i)
-        y.append(i)
+        x[i] = None
+        y[i] = None
+        self.add_to_family(i, pair(a, b))
+        return i
 
-        if self.form:
-            self.find_points_for_rib(i)
-            self.find_text_layout(i)
+    def restore_rib(self, i, a, b, w, dir, place):
+        assert i not in self.ribs, 'rib index is used'
+        self.ribs[i] = [a, b, w, set(dir)]
+        self.vertices.get(a)[i] = None
+        self.vertices.get(b)[i] = None
+        self.next_rib = max(self.next_rib, i + 1)
+        self.insert_to_family(i, pair(a, b), place)
         return i
 
     def del_rib(self, i):
@@ -93,21 +220,95 @@ class DictGraph(Graph):
         b = self.ribs.get(i)[1]
         x = self.vertices.get(a)
         y = self.vertices.get(b)
-        x.remove(i)
-        y.remove(i)
-        for dict in [self.rib_colours, self.rib_points, self.rib_orientation, self.rib_text_layout, self.ribs]:
-            del dict[i]
+        x.pop(i, None)
+        y.pop(i, None)
+        self.del_from_family(i, pair(a, b))
+        self.rib_grid.remove(i)
+        for dict in self.rib_dicts():
+            dict.pop(i, None)
+
+    def set_ribs(self, ribs):
+        vertices, pairs, all_ribs = self.vertices, self.pairs, self.ribs
+        first = i = self.next_rib
+        big = {}
+        for a, b, w, dir in ribs:
+            all_ribs[i] = [a, b, w, dir]
+            vertices[a][i] = None
+            vertices[b][i] = None
+            key = (a, b) if a <= b else (b, a)  # pair(a, b)
+            family = pairs.get(key)
+            if family is None:
+                family = pairs[key] = {}
+            family[i] = None
+            if len(family) > 2 * len(CURVATURE):
+                big[key] = None
+            i += 1
+        self.next_rib = i
+        self.touch()
+        self.invalidate(range(first, i))
+        for key in big:
+            self.invalidate(pairs[key])
+        return range(first, i)
+
+    def add_to_family(self, i, key):
+        self.touch()
+        family = self.pairs.setdefault(key, {})
+        family[i] = None
+        if len(family) > 2 * len(CURVATURE):
+            self.invalidate(family)
+        else:
+            self.invalidate([i])  # new rib is the last one in the family, so others don't change
+
+    def insert_to_family(self, i, key, place):
+        # ribs from place on move one place down, so they are invalidated like in del_from_family
+        family = self.pairs.get(key)
+        if family is None or place >= len(family):
+            self.add_to_family(i, key)
+            return
+        self.touch()
+        later = list(family)[place:]
+        for e in later:
+            del family[e]
+        family[i] = None
+        family.update(dict.fromkeys(later))
+        self.invalidate(family if len(family) > 2 * len(CURVATURE) else [i] + later)
+
+    def del_from_family(self, i, key):
+        # ribs after i move one place up in the family and change orientation and curvature
+        self.touch()
+        family = self.pairs.get(key)
+        later = list(family)
+        if len(later) <= 2 * len(CURVATURE):
+            later = later[later.index(i) + 1:]
+        del family[i]
+        if not family:
+            del self.pairs[key]
+        self.stale.pop(i, None)
+        self.changed.pop(i, None)
+        self.invalidate([e for e in later if e != i])
+
+    def rib_dicts(self):
+        return [self.rib_colours, self.weight_colours, self.rib_points, self.rib_points_simple, self.rib_orientation,
+                self.rib_text_layout, self.rib_text_layout_simple, self.ribs]
 
     def del_vertex(self, a):
         x = self.vertices.get(a).copy()
         for n in x:
             self.del_rib(n)
         for dict in [self.form, self.ver_sizes, self.ver_colours, self.vertices]:
-            del dict[a]
+            dict.pop(a, None)
+        self.vertex_grid.remove(a)
+        self.touch()
 
     def rename_vertex(self, old, new):
+        self.touch()
+        self.invalidate(self.vertices.get(old))  # orientation depends on order of names
         for i in self.vertices.get(old):  # edit ribs
             rib = self.ribs.get(i)
+            other = rib[1] if rib[0] == old else rib[0]
+            family = self.pairs.pop(pair(old, other), None)
+            if family is not None:
+                self.pairs[pair(new, other)] = family
             rib[rib.index(old)] = new
             if old in rib[3]:
                 rib[3].remove(old)
@@ -115,12 +316,50 @@ class DictGraph(Graph):
         for dict in [self.form, self.ver_sizes, self.ver_colours, self.vertices]:
             dict[new] = dict.get(old)
             del dict[old]
+        self.vertex_grid.remove(old)
+        if self.form.get(new):
+            self.vertex_grid.insert(new, *self.form.get(new), *self.form.get(new))
+
+    def reweigh_rib(self, i, w):
+        self.ribs.get(i)[2] = w
+        self.touch()
+        self.changed[i] = None
 
     def get_ribs(self, a, b):
-        x = self.vertices.get(a)
-        y = self.vertices.get(b)
-        z = [i for i in x if i in y]
-        return z
+        return list(self.pairs.get(pair(a, b), ()))
+
+    def rib_count(self, a, b):
+        return len(self.pairs.get(pair(a, b), ()))
+
+    def has_rib(self, a, b):
+        return pair(a, b) in self.pairs
+
+    def __setstate__(self, state):
+        # graphs pickled before self.pairs existed or with rib lists in self.vertices
+        self.__dict__.update(state)
+        for k, x in self.vertices.items():
+            if isinstance(x, list):
+                self.vertices[k] = dict.fromkeys(x)
+        if 'pairs' not in state:
+            self.pairs = {}
+            for i, rib in self.ribs.items():
+                self.pairs.setdefault(pair(rib[0], rib[1]), {})[i] = None
+        if 'stale' not in state:
+            self.stale = {}
+        if 'changed' not in state:
+            self.changed = {}
+        if 'invalidations' not in state:
+            self.invalidations = 0
+        if 'version' not in state:
+            self.version = 0
+            self.snapshots = {}
+        if 'vertex_grid' not in state or not hasattr(self.rib_grid, 'lines'):  # or rib_grid with bounding boxes of ribs
+            self.vertex_grid = GridIndex()
+            self.rib_grid = GridIndex(250)
+            for name, coor in self.form.items():
+                self.vertex_grid.insert(name, *coor, *coor)
+            for i in self.rib_points:
+                self.index_rib(i)
 
     def view(self):
         l = [k for k in self.vertices.keys()]
@@ -136,10 +375,9 @@ class DictGraph(Graph):
             self.rib_orientation[i]= family.index(i) % 2
         else:
             self.rib_orientation[i] = (family.index(i)+1) % 2
-        level = family.index(i) // 2
+        level = bundle_level(family.index(i), len(family))
         # fsort = sorted([([neighbour]+self.ribs.get(neighbour)) for neighbour in family if family.index(neighbour) % 2 == ori], key = lambda e: e[3])
 
-        k = [100,20,8,4][level]
         rib = self.ribs.get(i)
         a, b = rib[0], rib[1]
         arrow1, arrow2 = 0, 0
@@ -154,7 +392,7 @@ class DictGraph(Graph):
         b_inclination = distance(*a_coor, *b_coor) - b_size + distance(*a_coor, *b_coor)/200
         a_epsilon = find_points(*a_coor, a_size, *b_coor, a_inclination + a_size/4 * level * arrow1) # a_epsilon0 and a_epsilon1 - two opposite points on the a-vertex circle
         b_epsilon = find_points(*a_coor, b_inclination + b_size/4 * level * arrow2, *b_coor, b_size) # b_epsilon0 and b_epsilon1
-        ac_bc = distance(*a_coor, *b_coor)/2 + distance(*a_coor, *b_coor)/k # ac distance either equals bc, ad and bd
+        ac_bc = distance(*a_coor, *b_coor)/2 + distance(*a_coor, *b_coor)*curvature(level) # ac distance either equals bc, ad and bd
 
         c_d = find_points(*a_coor, ac_bc, *b_coor, ac_bc) # two opposite points c and d
 
@@ -188,71 +426,116 @@ class DictGraph(Graph):
         ##
         self.rib_text_layout[i] = list(zip(angles, textpoints))
         self.rib_text_layout_simple[i] = list(zip(angles, textpoints2)) # for a non-multigraph
-
-
-
+        self.index_rib(i)
+        self.stale.pop(i, None)
+
+    def find_geometry(self, ribs = None):
+        # the same as find_points_for_rib and find_text_layout for all ribs (or for families of given ribs),
+        # but every family is computed at once and points shared by its ribs are computed only once
+        if ribs is None:
+            families = self.pairs.values()
+        else:
+            families = {}
+            for i in ribs:
+                rib = self.ribs.get(i)
+                key = pair(rib[0], rib[1])
+                families[key] = self.pairs.get(key)
+            families = families.values()
+
+        collect = gc.isenabled()
+        gc.disable()  # a lot of small lists are created here, garbage collector passes only slow it down
+        try:
+            self.find_families_geometry(families)
+        finally:
+            if collect:
+                gc.enable()
+
+    def find_families_geometry(self, families):
+        for family in families:
+            shared = {}
+            size = len(family)
+            for n, i in enumerate(family):
+                rib = self.ribs.get(i)
+                a, b = rib[0], rib[1]
+                level = bundle_level(n, size)
+                if a < b:
+                    self.rib_orientation[i] = n % 2
+                else:
+                    self.rib_orientation[i] = (n+1) % 2
+                arrow1 = 1 if a in rib[3] else 0
+                arrow2 = 1 if b in rib[3] else 0
+
+                a_size, b_size = self.ver_sizes.get(a), self.ver_sizes.get(b)
+                a_coor, b_coor = self.form.get(a), self.form.get(b)
+                if a not in shared:
+                    d = distance(*a_coor, *b_coor)
+                    a_epsilon = find_points(*a_coor, a_size, *b_coor, d - a_size + 1)
+                    b_epsilon = find_points(*a_coor, d - b_size + 1, *b_coor, b_size)
+                    c_d = find_points(*a_coor, d/2 + 1, *b_coor, d/2 + 1)
+                    simple = [[(p[0][0]+p[1][0])/2, (p[0][1]+p[1][1])/2] for p in [a_epsilon, c_d, b_epsilon]]
+                    centre = [(a_coor[0]+b_coor[0])/2, (a_coor[1]+b_coor[1])/2]
+                    shared[a] = d, simple, centre
+                d, simple, centre = shared.get(a)
+                if (a, level) not in shared:
+                    ac_bc = d/2 + d*curvature(level)
+                    c_d = find_points(*a_coor, ac_bc, *b_coor, ac_bc)
+                    angles = [degrees(atan2(-(e[1]-centre[1]), e[0]-centre[0])) for e in c_d]
+                    textpoints = [[(e[0]+centre[0])/2, (e[1]+centre[1])/2] for e in c_d]
+                    shared[(a, level)] = c_d, angles, textpoints
+                c_d, angles, textpoints = shared.get((a, level))
+
+                a_epsilon = find_points(*a_coor, a_size, *b_coor, d - a_size + d/200 + a_size/4 * level * arrow1)
+                b_epsilon = find_points(*a_coor, d - b_size + d/200 + b_size/4 * level * arrow2, *b_coor, b_size)
+                self.rib_points[i] = list(zip(a_epsilon, c_d, b_epsilon))
+                self.rib_points_simple[i] = [p.copy() for p in simple]
+                self.rib_text_layout[i] = list(zip(angles, [p.copy() for p in textpoints]))
+                self.rib_text_layout_simple[i] = list(zip(angles, [simple[1].copy(), simple[1].copy()]))
+                self.index_rib(i)
+                self.stale.pop(i, None)
+
+
+CURVATURE = [100, 20, 8, 4]  # distance between vertices divided by bulge of rib arc for every level of family
+
+
+def bundle_level(n, size):
+    # level of n-th rib in family of size ribs, levels of big family are spread evenly between 0 and the last level of the table
+    level = n // 2
+    levels = (size + 1) // 2
+    if levels <= len(CURVATURE):
+        return level
+    return level * (len(CURVATURE) - 1) / (levels - 1)
+
+
+def curvature(level):
+    # bulge of rib arc as a part of distance between vertices, fractional levels are interpolated
+    k = int(level)
+    t = level - k
+    if not t:
+        return 1 / CURVATURE[k]
+    return (1 - t) / CURVATURE[k] + t / CURVATURE[k+1]
 
 
 def find_points(x1, y1, r1, x2, y2, r2):
     vv = (x1 - x2) ** 2 + (y1 - y2) ** 2
     a = (r1 + r2) * (r1 - r2) / 2 / vv + 0.5
-    b = sqrt(r1 ** 2 / vv - a ** 2)
+    b = sqrt(max(r1 ** 2 / vv - a ** 2, 0))  # circles don't cross if vertices overlap, the nearest point is taken
     p1x = x1 + a * (x2 - x1) - b * (y2 - y1)
     p1y = y1 + a * (y2 - y1) + b * (x2 - x1)
     p2x = x1 + a * (x2 - x1) + b * (y2 - y1)
     p2y = y1 + a * (y2 - y1) - b * (x2 - x1)
     return [p1x, p1y], [p2x, p2y]
 
+def pair(a, b):
+    return (a, b) if a <= b else (b, a)
+
 def distance(x1, y1, x2, y2):
     return sqrt((x1-x2)**2 + (y1-y2)**2)
 
-def random_graph(v, r, weighted = 1, directed = 1, multigraph = 1):
-    import random
-    names = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U',
-             'V', 'W', 'X', 'Y', 'Z'][:v]
-
-    form = []
-    while True:
-        test = 0
-        x = random.choice(range(30, 570))
-        y = random.choice(range(30, 370))
-        for e in form:
-            if e[0] - 20 < x < e[0] + 20 or e[1] - 20 < y < e[1] + 20:
-                test = 1
-        if test:
-            continue
-        form.append((x, y))
-        if len(form) == v:
-            break
-
-    ribs = []
-    # i = 1
-    j = 6
-    w, d = 1, set()
-    while True:
-        a = random.choice(names)
-        b = random.choice(names)
-        if a != b:
-            if multigraph or ([a, b] not in ribs and [b, a] not in ribs):
-                ribs.append([a, b])
-
-        if len(ribs) == r:
-            break
-    for rib in ribs:
-        if weighted:
-            w = random.choice(range(j-5, j+5))
-            j += 5
-        rib.append(w)
-        if directed:
-            d = set(random.choice([rib[0], rib[1]]))
-        rib.append(d)
-
-    g = DictGraph(*(names))
-    g.directed, g.weighted, g.multigraph = directed, weighted, multigraph
-    g.set_form(*form)
-    for e in ribs:
-        g.set_rib(*e)
-
+def random_graph(v, r, weighted = 1, directed = 1, multigraph = 1, seed = None):
+    # G(n, m) graph with computed geometry, generators module has other models and doesn't compute geometry
+    from generators import gnm
+    g = gnm(v, r, multigraph, weighted, directed, seed)
+    g.update_geometry()
     return g
 
 
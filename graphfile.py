@@ -0,0 +1,155 @@
+'''
+Binary file format for graphs. Only source data is stored: vertices, form, sizes, colours, ribs, weights and directions.
+Geometry is not stored, it is computed when loaded graph is drawn (DictGraph.update_geometry). Rib indexes are not stored too, ribs are renumbered in the saved order.
+
+File starts with header (HEADER struct): magic bytes, format version, directed, weighted and multigraph flags, number of vertices, number of ribs and flag for form.
+Then columns follow, every column is 8 bytes length and data padded to 8 bytes. Numbers are little-endian.
+Vertex columns: names, x, y, sizes, fill colours, outline colours.
+Rib columns: first vertices, second vertices, weights, directions (bit 1 - first vertex, bit 2 - second one), colours, weight colours.
+Last column is palette - strings of all colours. Colours in other columns are numbers in palette, -1 means no colour.
+Strings columns store number of strings, offsets (uint64, one more than strings) and utf-8 bytes together.
+
+save writes graph to file, load reads it using mmap, so columns are not copied before graph is built. is_graph_file checks magic bytes.
+convert rewrites old pickle file to this format.
+
+'''
+
+from array import array
+import mmap
+import pickle
+import struct
+import sys
+from graph import DictGraph
+
+MAGIC = b'GRPH'
+VERSION = 1
+HEADER = struct.Struct('<4sHBBBBxxQQ')
+
+
+def save(g, filename):
+    names = list(g.vertices)
+    numbers = {name: k for k, name in enumerate(names)}
+    palette = {}
+    has_form = int(bool(g.form))
+
+    def colour(col):
+        if col is None:
+            return -1
+        return palette.setdefault(col, len(palette))
+
+    ribs = list(g.ribs.items())
+    columns = [
+        strings(names),
+        array('d', [g.form.get(n)[0] if has_form else 0 for n in names]),
+        array('d', [g.form.get(n)[1] if has_form else 0 for n in names]),
+        array('d', [g.ver_sizes.get(n) for n in names]),
+        array('q', [colour(g.ver_colours.get(n)[0]) for n in names]),
+        array('q', [colour(g.ver_colours.get(n)[1]) for n in names]),
+        array('Q', [numbers[rib[0]] for i, rib in ribs]),
+        array('Q', [numbers[rib[1]] for i, rib in ribs]),
+        array('d', [rib[2] for i, rib in ribs]),
+        array('B', [(rib[0] in rib[3]) | (rib[1] in rib[3]) << 1 for i, rib in ribs]),
+        array('q', [colour(g.rib_colours.get(i)) for i, rib in ribs]),
+        array('q', [colour(g.weight_colours.get(i)) for i, rib in ribs]),
+    ]
+    columns.append(strings(list(palette)))
+
+    with open(filename, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, g.directed, g.weighted, g.multigraph, has_form, len(names), len(ribs)))
+        for column in columns:
+            data = little(column)
+            f.write(struct.pack('<Q', len(data)))
+            f.write(data)
+            f.write(bytes(-len(data) % 8))
+
+
+def load(filename, cls = DictGraph):
+    with open(filename, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                return read(view, cls)
+            finally:
+                view.release()
+
+
+def read(view, cls):
+    magic, version, directed, weighted, multigraph, has_form, v, r = HEADER.unpack_from(view)
+    assert magic == MAGIC, 'not a graph file'
+    assert version <= VERSION, 'file is made by newer version'
+    offset = HEADER.size
+    columns = []
+    for typecode in ['s', 'd', 'd', 'd', 'q', 'q', 'Q', 'Q', 'd', 'B', 'q', 'q', 's']:
+        length = struct.unpack_from('<Q', view, offset)[0]
+        offset += 8
+        data = view[offset:offset + length]
+        offset += length + (-length % 8)
+        columns.append(read_strings(data) if typecode == 's' else numbers(data, typecode))
+    names, xs, ys, sizes, fills, outlines, firsts, seconds, weights, dirs, colours, wcolours, palette = columns
+    assert len(names) == v and len(firsts) == r, 'file is broken'
+    palette.append(None)  # -1 is the last item
+
+    g = cls(*names)
+    g.directed, g.weighted, g.multigraph = directed, weighted, multigraph
+    for k, name in enumerate(names):
+        g.ver_sizes[name] = int(sizes[k]) if sizes[k].is_integer() else sizes[k]
+        g.ver_colours[name] = (palette[fills[k]], palette[outlines[k]])
+    for k in range(r):
+        a, b = names[firsts[k]], names[seconds[k]]
+        w = weights[k]
+        d = dirs[k]
+        dir = {e for e, bit in [(a, 1), (b, 2)] if d & bit}
+        i = g.set_rib(a, b, int(w) if w.is_integer() else w, dir)
+        if colours[k] != -1:
+            g.rib_colours[i] = palette[colours[k]]
+        if wcolours[k] != -1:
+            g.weight_colours[i] = palette[wcolours[k]]
+    if has_form:
+        form = {name: (xs[k], ys[k]) for k, name in enumerate(names)}
+        g.set_form(*[form.get(name) for name in sorted(names)])
+    return g
+
+
+def numbers(data, typecode):
+    if sys.byteorder == 'big':
+        column = array(typecode, data)
+        column.byteswap()
+        return column
+    return data.cast(typecode)
+
+
+def strings(l):
+    data = [s.encode('utf-8') for s in l]
+    offsets = [len(l), 0]
+    for s in data:
+        offsets.append(offsets[-1] + len(s))
+    column = array('B', little(array('Q', offsets)))
+    column.frombytes(b''.join(data))
+    return column
+
+
+def read_strings(data):
+    n = struct.unpack_from('<Q', data)[0]
+    offsets = numbers(data[8:8*(n+2)], 'Q')
+    blob = bytes(data[8*(n+2):])
+    return [blob[offsets[k]:offsets[k+1]].decode('utf-8') for k in range(n)]
+
+
+def little(column):
+    if sys.byteorder == 'big' and column.itemsize > 1:
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def is_graph_file(filename):
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def convert(pickle_filename, filename):
+    # rewrites pickled DictGraph in this format, pickle can execute code, so convert only your own files
+    with open(pickle_filename, 'rb') as f:
+        g = pickle.load(f)
+    save(g, filename)
+    return g
@@ -0,0 +1,286 @@
+'''
+Streaming import and export of graphs in edge list (csv, tsv), GraphML and DOT formats.
+
+Readers are generators of ribs (a, b, w, dir), so files are never read completely. read_edges reads lines "a,b[,weight[,direction]]", direction is
+'>' (arrow to b), '<' (arrow to a), '<>' (both) or empty. The first line is header if its weight isn't a number, if its names are usual column names (HEADER_NAMES)
+or if they aren't numbers while names of the second line are. Weight of any other line must be a number, otherwise ValueError with the line number is raised.
+read_graphml removes every read node and edge from the tree which iterparse builds, so memory doesn't grow with file size. read_graphml and read_dot read the most usual subset of these formats (GraphML weight, x, y and direction data, DOT weight, dir and pos attributes).
+Every reader takes progress function which is called with part of the file that has been read.
+build adds ribs from any iterable to the graph by chunks: new vertices of the chunk are created by one set_vertices call and then its ribs are set.
+Self-loops (ribs from vertex to itself) can't be drawn, so they are skipped, build puts their number to report dict as 'loops'.
+Geometry isn't computed, graph gets form later (from layout or place_on_grid). load chooses reader by file extension and builds new graph.
+
+Writers write_edges, write_graphml and write_dot write graph rib by rib, save chooses writer by file extension.
+
+'''
+
+import csv
+import os
+import re
+from xml.etree.ElementTree import iterparse
+from xml.sax.saxutils import quoteattr
+from graph import DictGraph
+
+HEADER_NAMES = {'source', 'target', 'from', 'to', 'src', 'dst', 'node1', 'node2', 'vertex1', 'vertex2', 'head', 'tail'}
+
+
+def read_edges(filename, delimiter = None, directed = 0, progress = None):
+    if delimiter is None:
+        delimiter = '\t' if filename.endswith('.tsv') else ','
+    size = os.path.getsize(filename) or 1
+    first = 1
+    pending = None  # the first rib if its names aren't numbers, it is header if names of the second rib are numbers
+    with open(filename, newline = '') as f:
+        reader = csv.reader(f, delimiter = delimiter)
+        for k, row in enumerate(reader):
+            if len(row) < 2 or row[0].startswith('#'):
+                continue
+            a, b = row[0].strip(), row[1].strip()
+            w = number(row[2]) if len(row) > 2 and row[2].strip() else 1
+            if w is None:
+                if first:  # header
+                    first = 0
+                    continue
+                raise ValueError('line {}: weight {!r} is not a number'.format(reader.line_num, row[2].strip()))
+            d = row[3].strip() if len(row) > 3 else ('>' if directed else '')
+            rib = a, b, w, direction(a, b, d)
+            if first:
+                first = 0
+                if a.lower() in HEADER_NAMES and b.lower() in HEADER_NAMES:
+                    continue
+                if number(a) is None and number(b) is None:
+                    pending = rib
+                    continue
+            elif pending:
+                if number(a) is None or number(b) is None:
+                    yield pending
+                pending = None
+            yield rib
+            if progress and k % 10000 == 0:
+                progress(f.buffer.tell() / size)
+    if pending:
+        yield pending
+
+
+def read_graphml(filename, progress = None):
+    size = os.path.getsize(filename) or 1
+    keys = {}
+    directed = 0
+    graph = None
+    with open(filename, 'rb') as f:
+        for k, (event, el) in enumerate(iterparse(f, events = ('start', 'end'))):
+            tag = el.tag.rsplit('}', 1)[-1]
+            if event == 'start':
+                if tag == 'graph':
+                    directed = el.get('edgedefault') == 'directed'
+                    graph = el
+                continue
+            if tag == 'key':
+                keys[el.get('id')] = el.get('attr.name')
+            elif tag == 'edge':
+                a, b = el.get('source'), el.get('target')
+                data = {keys.get(d.get('key')): d.text for d in el if d.tag.rsplit('}', 1)[-1] == 'data'}
+                w = number(data.get('weight') or '1')
+                is_directed = el.get('directed', 'true' if directed else 'false') == 'true'
+                mark = data.get('direction', '>' if is_directed else '')
+                yield a, b, 1 if w is None else w, direction(a, b, mark)
+            elif tag == 'node':
+                data = {keys.get(d.get('key')): d.text for d in el if d.tag.rsplit('}', 1)[-1] == 'data'}
+                if data.get('x') is not None and data.get('y') is not None:
+                    yield el.get('id'), None, (number(data.get('x')), number(data.get('y'))), None
+                else:
+                    yield el.get('id'), None, None, None
+            if tag in ('node', 'edge'):
+                el.clear()
+                if graph is not None:
+                    del graph[:]  # cleared elements stay in graph element otherwise
+            if progress and k % 10000 == 0:
+                progress(f.tell() / size)
+
+
+DOT_ID = r'"(?:[^"\\]|\\.)*"|[\w.]+'
+DOT_STATEMENT = re.compile(r'\s*({0})((?:\s*(?:--|->)\s*(?:{0}))*)\s*(?:\[([^\]]*)\])?'.format(DOT_ID))
+DOT_EDGE = re.compile(r'(--|->)\s*({0})'.format(DOT_ID))
+DOT_ATTRIBUTE = re.compile(r'(\w+)\s*=\s*({0})'.format(DOT_ID))
+
+
+def read_dot(filename, progress = None):
+    # every line may contain several statements separated by ';', subgraphs and attribute statements are skipped
+    size = os.path.getsize(filename) or 1
+    with open(filename) as f:
+        for k, line in enumerate(f):
+            for statement in line.split(';'):
+                statement = statement.strip().rstrip('{}').strip()
+                if not statement or statement.startswith(('//', '#', 'graph', 'digraph', 'strict', 'node', 'edge', 'subgraph', '}')):
+                    continue
+                m = DOT_STATEMENT.match(statement)
+                if not m or statement[m.end():].lstrip().startswith('='):  # graph attribute like rankdir=LR
+                    continue
+                attributes = {key: dot_id(value) for key, value in DOT_ATTRIBUTE.findall(m.group(3) or '')}
+                a = dot_id(m.group(1))
+                edges = DOT_EDGE.findall(m.group(2))
+                if not edges:
+                    pos = attributes.get('pos')
+                    coor = tuple(number(c) for c in pos.split(',')[:2]) if pos else None
+                    yield a, None, coor, None
+                for op, b in edges:
+                    b = dot_id(b)
+                    w = number(attributes.get('weight', '1'))
+                    mark = {'both': '<>', 'back': '<', 'none': ''}.get(attributes.get('dir'), '>' if op == '->' else '')
+                    yield a, b, 1 if w is None else w, direction(a, b, mark)
+                    a = b
+            if progress and k % 10000 == 0:
+                progress(f.buffer.tell() / size)
+
+
+def build(ribs, g = None, chunk = 10000, progress = None, report = None):
+    # ribs with b equal to None are single vertices, their w is coordinates or None
+    if g is None:
+        g = DictGraph()
+    form = {}
+    batch = []
+    count = loops = 0
+    for rib in ribs:
+        if rib[0] == rib[1]:
+            loops += 1
+            rib = rib[0], None, None, None  # its vertex is created anyway
+        batch.append(rib)
+        if len(batch) == chunk:
+            count += add_chunk(g, batch, form)
+            batch = []
+            if progress:
+                progress(count)
+    count += add_chunk(g, batch, form)
+    if progress:
+        progress(count)
+    if form and len(form) == len(g.vertices):
+        g.set_form(*[form.get(name) for name in sorted(g.vertices)])
+    if report is not None:
+        report['loops'] = loops
+    return g
+
+
+def add_chunk(g, batch, form):
+    new = {}
+    for a, b, w, dir in batch:
+        for name in (a, b):
+            if name is not None and name not in g.vertices:
+                new[name] = None
+    g.set_vertices(*new)
+    for name in new:
+        g.ver_colours[name] = ('white', 'black')
+        g.ver_sizes[name] = 20
+    count = 0
+    for a, b, w, dir in batch:
+        if b is None:
+            if w:
+                form[a] = w
+            continue
+        if not g.multigraph and g.has_rib(a, b):
+            g.multigraph = 1
+        if w != 1:
+            g.weighted = 1
+        if dir:
+            g.directed = 1
+        g.set_rib(a, b, w, dir)
+        count += 1
+    return count
+
+
+def load(filename, cls = DictGraph, progress = None, read_progress = None, report = None):
+    # progress gets number of read ribs, read_progress gets part of the file, report is the same as in build
+    if filename.endswith(('.graphml', '.xml')):
+        ribs = read_graphml(filename, read_progress)
+    elif filename.endswith(('.dot', '.gv')):
+        ribs = read_dot(filename, read_progress)
+    else:
+        ribs = read_edges(filename, progress = read_progress)
+    return build(ribs, cls(), progress = progress, report = report)
+
+
+def place_on_grid(g, step = 80):
+    # simple form for graph without layout: vertices are placed on square grid in sorted order
+    side = max(1, int(len(g.vertices) ** 0.5 + 0.999))
+    g.set_form(*[(step//2 + step * (k % side), step//2 + step * (k // side)) for k in range(len(g.vertices))])
+
+
+def write_edges(g, filename, delimiter = None):
+    if delimiter is None:
+        delimiter = '\t' if filename.endswith('.tsv') else ','
+    with open(filename, 'w', newline = '') as f:
+        writer = csv.writer(f, delimiter = delimiter)
+        for rib in g.ribs.values():
+            writer.writerow([rib[0], rib[1], rib[2], direction_mark(rib)])
+
+
+def write_graphml(g, filename):
+    with open(filename, 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+        f.write('<key id="w" for="edge" attr.name="weight" attr.type="double"/>\n<key id="d" for="edge" attr.name="direction" attr.type="string"/>\n')
+        f.write('<key id="x" for="node" attr.name="x" attr.type="double"/>\n<key id="y" for="node" attr.name="y" attr.type="double"/>\n')
+        f.write('<graph edgedefault="undirected">\n')
+        for name in g.vertices:
+            coor = g.form.get(name)
+            data = '<data key="x">{}</data><data key="y">{}</data>'.format(*coor) if coor else ''
+            f.write('<node id={}>{}</node>\n'.format(quoteattr(name), data))
+        for rib in g.ribs.values():
+            mark = direction_mark(rib)
+            directed = ' directed="true"' if mark else ''
+            data = '<data key="d">{}</data>'.format(quoteattr(mark)[1:-1]) if mark not in ('', '>') else ''
+            f.write('<edge source={} target={}{}><data key="w">{}</data>{}</edge>\n'.format(quoteattr(rib[0]), quoteattr(rib[1]), directed, rib[2], data))
+        f.write('</graph>\n</graphml>\n')
+
+
+def write_dot(g, filename):
+    # directed graph is written as digraph, ribs without arrow to the second vertex get dir attribute
+    directed = any(rib[3] for rib in g.ribs.values())
+    with open(filename, 'w') as f:
+        f.write('digraph {\n' if directed else 'graph {\n')
+        for name in g.vertices:
+            coor = g.form.get(name)
+            f.write('  {}{};\n'.format(dot_quote(name), ' [pos="{},{}"]'.format(*coor) if coor else ''))
+        for rib in g.ribs.values():
+            mark = direction_mark(rib)
+            attributes = 'weight={}'.format(rib[2])
+            if directed and mark != '>':
+                attributes += ', dir={}'.format({'<>': 'both', '<': 'back', '': 'none'}.get(mark))
+            f.write('  {} {} {} [{}];\n'.format(dot_quote(rib[0]), '->' if directed else '--', dot_quote(rib[1]), attributes))
+        f.write('}\n')
+
+
+def save(g, filename):
+    if filename.endswith(('.graphml', '.xml')):
+        write_graphml(g, filename)
+    elif filename.endswith(('.dot', '.gv')):
+        write_dot(g, filename)
+    else:
+        write_edges(g, filename)
+
+
+def number(s):
+    try:
+        return int(s)
+    except ValueError:
+        try:
+            return float(s)
+        except ValueError:
+            return None
+
+
+def direction(a, b, mark):
+    return {'>': {b}, '<': {a}, '<>': {a, b}}.get(mark, set())
+
+
+def direction_mark(rib):
+    a, b = rib[0] in rib[3], rib[1] in rib[3]
+    return '<>' if a and b else '<' if a else '>' if b else ''
+
+
+def dot_id(s):
+    if s.startswith('"'):
+        return s[1:-1].replace('\\"', '"')
+    return s
+
+
+def dot_quote(name):
+    return '"' + name.replace('"', '\\"') + '"'
@@ -0,0 +1,60 @@
+'''
+Undo and redo history of graph edits.
+
+History stores edits as small operations (tuples), not as copies of the graph, so undoing or redoing one edit takes time and memory of this edit only.
+Operation is a tuple with its kind as the first element:
+('add_vertex', name, coor, size, colours) and ('del_vertex', name, coor, size, colours) are inverse to each other,
+('add_rib', i, a, b, w, dir, colour, weight_colour, place) and ('del_rib', ...) with the same fields too, place is the place of rib in its family (DictGraph.pairs).
+Other operations change one value and end with its old and new value: ('move', name, old, new), ('resize', name, old, new), ('reweigh', i, old, new),
+('colour', dict_name, key, old, new) and ('rename', old, new). inverse swaps kinds of the first ones and two last values of the others.
+History doesn't change graph itself, Window applies operations (Window.apply_op).
+
+'''
+
+from collections import deque
+
+INVERSE = {'add_vertex': 'del_vertex', 'del_vertex': 'add_vertex', 'add_rib': 'del_rib', 'del_rib': 'add_rib'}
+
+
+def inverse(op):
+    if op[0] in INVERSE:
+        return (INVERSE[op[0]],) + op[1:]
+    return op[:-2] + (op[-1], op[-2])
+
+
+class History():
+    '''
+    self.done is deque of entries (tuples of operations of one edit) which can be undone, only the last self.depth entries are kept.
+    self.undone is stack of undone entries for redo, it is cleared by every new edit.
+    add records operations of one edit which is already done, all of them are one entry (for example, deleting of vertex with its ribs).
+    undo and redo return list of operations to apply (undo returns inverse operations in reverse order), it is empty if there is nothing to undo or redo.
+    '''
+    def __init__(self, depth = 1000):
+        self.depth = depth
+        self.done = deque(maxlen = depth)
+        self.undone = []
+
+    def add(self, *ops):
+        self.done.append(ops)
+        self.undone = []
+
+    def undo(self):
+        if not self.done:
+            return []
+        ops = self.done.pop()
+        self.undone.append(ops)
+        return [inverse(op) for op in reversed(ops)]
+
+    def redo(self):
+        if not self.undone:
+            return []
+        ops = self.undone.pop()
+        self.done.append(ops)
+        return list(ops)
+
+    def clear(self):
+        self.done.clear()
+        self.undone = []
+
+    def __len__(self):
+        return len(self.done)
@@ -0,0 +1,202 @@
+'''
+Force-directed layout for big graphs. force_layout computes form of graph with Fruchterman-Reingold algorithm and sets it by set_form.
+
+Vertices repel each other and ribs attract their vertices, k is desired distance between vertices. Repulsion is computed only between vertices
+in neighbouring cells of a grid with 2*k side (grid-approximated repulsion), so one iteration takes linear time instead of quadratic. Parallel ribs attract as one rib.
+Positions and forces are stored in flat float arrays. Repulsion of different parts of vertices can be computed by a pool of processes (processes parameter),
+every process gets positions, builds its own grid and returns forces for its part. Movement of every vertex is limited by temperature which falls every iteration.
+
+Forces are computed in pure Python, vertex by vertex: flat arrays save memory, but they aren't vectorised (the editor doesn't depend on NumPy).
+So layout is practical for thousands of vertices, not for millions: one iteration takes about 0.07s for 10^3 vertices and 1-2s for 10^4 vertices
+with 2 ribs per vertex on one core (bench.bench_layout), so default 50 iterations of 10^4 vertices take about a minute and 10^5 vertices take many minutes.
+Processes speed up only repulsion and pay for passing positions to them every iteration. Layout runs in background and can be stopped, form of stopped layout is still usable.
+
+force_layout doesn't need tkinter. It calls progress with part of done iterations and stops after the iteration when stop returns true, in both cases form is set.
+compute_form does the same, but returns coordinates for set_form instead of setting them. It reads graph only at the start, run in background thread (worker module)
+it gets a copy made by worker.layout_copy in tkinter thread, as the drawn graph can change meanwhile.
+Forces don't keep vertices apart for sure, so the last pass (separate) pushes apart vertices closer than gap (twice the biggest vertex size by default),
+rib geometry needs vertices which don't overlap.
+Existing form is improved, vertices without form get random start positions (seed makes them repeatable).
+
+'''
+
+from array import array
+from math import sqrt
+from multiprocessing import Pool
+import random
+
+
+def force_layout(g, iterations = 50, k = 80, processes = 1, progress = None, stop = None, seed = None, gap = None):
+    if g.vertices:
+        g.set_form(*compute_form(g, iterations, k, processes, progress, stop, seed, gap))
+    return g
+
+
+def compute_form(g, iterations = 50, k = 80, processes = 1, progress = None, stop = None, seed = None, gap = None):
+    names = sorted(g.vertices)  # order of set_form
+    n = len(names)
+    if not n:
+        return []
+    if gap is None:
+        gap = 2 * max([g.ver_sizes.get(name) or 0 for name in names] + [1])
+    numbers = {name: v for v, name in enumerate(names)}
+    edges = array('l')
+    for a, b in g.pairs:
+        if a != b:
+            edges.extend((numbers[a], numbers[b]))
+    xs, ys = start_positions(g, names, k, seed)
+    start = k * sqrt(n) / 10
+    pool = Pool(processes) if processes > 1 else None
+    try:
+        for it in range(iterations):
+            dx, dy = repulsion(xs, ys, k, pool, processes)
+            attraction(xs, ys, edges, k, dx, dy)
+            move(xs, ys, dx, dy, max(start * (1 - it / iterations), 1))
+            if progress:
+                progress((it + 1) / iterations)
+            if stop and stop():
+                break
+    finally:
+        if pool:
+            pool.terminate()
+    separate(xs, ys, gap)
+    left, top = min(xs), min(ys)
+    return [[xs[v] - left + k/2, ys[v] - top + k/2] for v in range(n)]
+
+
+def start_positions(g, names, k, seed = None):
+    rand = random.Random(seed)
+    side = k * sqrt(len(names))
+    xs, ys = array('d'), array('d')
+    for name in names:
+        coor = g.form.get(name)
+        if coor is None:
+            coor = rand.uniform(0, side), rand.uniform(0, side)
+        xs.append(coor[0])
+        ys.append(coor[1])
+    return xs, ys
+
+
+def repulsion(xs, ys, k, pool = None, processes = 1):
+    if pool is None:
+        return repulse_part((xs, ys, k, 0, len(xs)))
+    step = len(xs) // processes + 1
+    parts = pool.map(repulse_part, [(xs, ys, k, lo, min(lo + step, len(xs))) for lo in range(0, len(xs), step)])
+    dx, dy = array('d'), array('d')
+    for part in parts:
+        dx.extend(part[0])
+        dy.extend(part[1])
+    return dx, dy
+
+
+def repulse_part(args):
+    # forces k*k/d from vertices closer than 2*k for vertices lo...hi-1, it is run in pool processes, so it gets one tuple
+    xs, ys, k, lo, hi = args
+    cell = 2 * k
+    grid = {}
+    for v in range(len(xs)):
+        grid.setdefault((int(xs[v] // cell), int(ys[v] // cell)), []).append(v)
+    kk, reach = k * k, cell * cell
+    dx, dy = array('d', bytes(8 * (hi - lo))), array('d', bytes(8 * (hi - lo)))
+    for v in range(lo, hi):
+        x, y = xs[v], ys[v]
+        cx, cy = int(x // cell), int(y // cell)
+        fx = fy = 0.0
+        for i in (cx - 1, cx, cx + 1):
+            for j in (cy - 1, cy, cy + 1):
+                for u in grid.get((i, j), ()):
+                    if u == v:
+                        continue
+                    ex, ey = x - xs[u], y - ys[u]
+                    d2 = ex * ex + ey * ey
+                    if d2 >= reach:
+                        continue
+                    if not d2:  # the same place, vertices are pushed apart by their numbers
+                        ex = (v - u) * 0.01
+                        d2 = ex * ex
+                    f = kk / d2
+                    fx += ex * f
+                    fy += ey * f
+        dx[v - lo] = fx
+        dy[v - lo] = fy
+    return dx, dy
+
+
+def attraction(xs, ys, edges, k, dx, dy):
+    # forces d*d/k between ends of every rib
+    for e in range(0, len(edges), 2):
+        a, b = edges[e], edges[e+1]
+        ex, ey = xs[a] - xs[b], ys[a] - ys[b]
+        f = sqrt(ex * ex + ey * ey) / k
+        dx[a] -= ex * f
+        dy[a] -= ey * f
+        dx[b] += ex * f
+        dy[b] += ey * f
+
+
+def close_pairs(xs, ys, gap):
+    # pairs of vertices closer than gap with their distances, grid with gap side is used
+    grid = {}
+    for v in range(len(xs)):
+        grid.setdefault((int(xs[v] // gap), int(ys[v] // gap)), []).append(v)
+    pairs = []
+    for (cx, cy), cell in grid.items():
+        for i in (cx - 1, cx, cx + 1):
+            for j in (cy - 1, cy, cy + 1):
+                for u in grid.get((i, j), ()):
+                    for v in cell:
+                        if v < u:
+                            d = sqrt((xs[v] - xs[u]) ** 2 + (ys[v] - ys[u]) ** 2)
+                            if d < gap:
+                                pairs.append((v, u, d))
+    return pairs
+
+
+def separate(xs, ys, gap, rounds = 20):
+    # every close pair is pushed apart to gap, if some pairs are still close after all rounds, the whole form is stretched (twice at most) and pushing is repeated
+    while True:
+        for _ in range(rounds):
+            pairs = close_pairs(xs, ys, gap)
+            if not pairs:
+                return
+            for v, u, d in pairs:
+                d = sqrt((xs[v] - xs[u]) ** 2 + (ys[v] - ys[u]) ** 2)  # earlier pushes of this round could move them
+                if d >= gap:
+                    continue
+                if not d:  # the same place, vertices are pushed apart by their numbers
+                    xs[u] += (u - v) * 0.01
+                    d = abs(u - v) * 0.01
+                ex, ey = (xs[v] - xs[u]) / d, (ys[v] - ys[u]) / d
+                push = (gap - d) / 2 * 1.01
+                xs[v] += ex * push
+                ys[v] += ey * push
+                xs[u] -= ex * push
+                ys[u] -= ey * push
+        pairs = close_pairs(xs, ys, gap)
+        if not pairs:
+            return
+        scale = min(gap / max(min(d for v, u, d in pairs), 1e-9) * 1.01, 2)
+        for v in range(len(xs)):
+            xs[v] *= scale
+            ys[v] *= scale
+
+
+def move(xs, ys, dx, dy, temperature):
+    for v in range(len(xs)):
+        d = sqrt(dx[v] * dx[v] + dy[v] * dy[v])
+        if d > temperature:
+            xs[v] += dx[v] * temperature / d
+            ys[v] += dy[v] * temperature / d
+        else:
+            xs[v] += dx[v]
+            ys[v] += dy[v]
+
+
+if __name__ == '__main__':
+    from graph import DictGraph
+    g = DictGraph(*[str(k) for k in range(100)])
+    for k in range(100):
+        g.set_rib(str(k), str((k + 1) % 100))
+    force_layout(g, progress = lambda part: print('{:.0%}'.format(part), end = ' '))
+    print()
+    print(g.form)
@@ -0,0 +1,112 @@
+'''
+Drawing of graph without tkinter.
+
+Renderer is the abstract base class of everything that draws graph: GraphCanvas (tkinter canvas) and file backends (svg.SvgRenderer).
+Subclasses must implement view_vertex, view_rib and view_rib_weight (abstract methods), view_graph draws all vertices and then ribs with their weights by chunks of whole families
+(at least self.chunk ribs, so weights of a chunk can be covered by ribs of the next one). Geometry of a chunk is computed right before it is drawn,
+as update_geometry is much faster for many ribs at once, and ribs which had no geometry before forget it after drawing (DictGraph.forget_geometry),
+so memory doesn't grow with the number of ribs. GraphCanvas has its own view_graph.
+
+vertex_look, rib_look and weight_look tell what must be drawn for vertex, rib and weight text, so all renderers draw the same picture.
+rib_line returns points of rib line, they are drawn as Tk smooth line: quadratic splines through midpoints of segments.
+arrow_polygon returns points of arrow of Tk default shape at the end of line.
+
+'''
+
+from abc import ABC, abstractmethod
+from math import sqrt
+
+
+class Renderer(ABC):
+    '''
+    Renderer draws graph by vertices, ribs and weights. view functions take graph and vertex name or rib index, view_graph takes graph.
+    '''
+    chunk = 10000
+
+    @abstractmethod
+    def view_vertex(self, g, name):
+        pass
+
+    @abstractmethod
+    def view_rib(self, g, i):
+        pass
+
+    @abstractmethod
+    def view_rib_weight(self, g, i):
+        pass
+
+    def view_graph(self, g):
+        for name in g.vertices.keys():
+            self.view_vertex(g, name)
+        chunk = []
+        for family in g.pairs.values():
+            chunk.extend(family)
+            if len(chunk) >= self.chunk:
+                self.view_chunk(g, chunk)
+                chunk = []
+        self.view_chunk(g, chunk)
+
+    def view_chunk(self, g, ribs):
+        fresh = [i for i in ribs if i in g.stale]
+        g.update_geometry(fresh)
+        for i in ribs:
+            self.view_rib(g, i)
+        if g.weighted:
+            for i in ribs:
+                self.view_rib_weight(g, i)
+        g.forget_geometry(fresh)
+
+
+def vertex_look(g, name):
+    # centre, radius, fill and outline colours
+    coor, colours = g.form.get(name), g.ver_colours.get(name)
+    return coor[0], coor[1], g.ver_sizes.get(name), colours[0], colours[1]
+
+
+def rib_look(g, i, col = 'black'):
+    # points of line, colour and end with arrow ('first', 'last', 'both' or None)
+    rib = g.ribs.get(i)
+    arrow = None
+    if g.directed:
+        arrowset = rib[3]
+        if len(arrowset) == 2:
+            arrow = 'both'
+        elif rib[0] in arrowset:
+            arrow = 'first'
+        elif rib[1] in arrowset:
+            arrow = 'last'
+    return rib_line(g, i), g.rib_colours.get(i) or col, arrow
+
+
+def weight_look(g, i):
+    # centre of weight text, its angle (degrees counterclockwise, as in Tk), text and colour
+    if i in g.stale:
+        g.update_geometry([i])
+    if g.multigraph:
+        layout = g.rib_text_layout.get(i)[g.rib_orientation.get(i)]
+    else:
+        layout = g.rib_text_layout_simple.get(i)[g.rib_orientation.get(i)]
+    if layout[0] < 0:
+        angle = layout[0] + 90
+    else:
+        angle = layout[0] - 90
+    return layout[1][0], layout[1][1], angle, g.ribs.get(i)[2], g.weight_colours.get(i)
+
+
+def rib_line(g, i):
+    # points of rib line as it is drawn
+    if i in g.stale:
+        g.update_geometry([i])
+    if g.multigraph:
+        return g.rib_points.get(i)[g.rib_orientation.get(i)]
+    return g.rib_points_simple.get(i)
+
+
+def arrow_polygon(start, end, width = 3, shape = (8, 10, 3)):
+    # arrow at end of line coming from start (Tk -arrowshape), line itself ends at the third point (neck of arrow)
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    length = sqrt(dx * dx + dy * dy) or 1
+    ux, uy = dx / length, dy / length
+    a, b, c = shape[0], shape[1], shape[2] + width / 2
+    x, y = end[0], end[1]
+    return [(x, y), (x - b * ux - c * uy, y - b * uy + c * ux), (x - a * ux, y - a * uy), (x - b * ux + c * uy, y - b * uy - c * ux)]
@@ -1,11 +1,22 @@
 from tkinter import *
 from tkinter.colorchooser import askcolor
 from tkinter.filedialog import *
+from tkinter.messagebox import askyesno
 from graph import *
 from canvas import *
 import random
-import pickle
+import graphfile
+import graphio
+import svg
+import layout
+import algorithms
+from generators import NameAllocator
+from tkinter.ttk import Progressbar
+from worker import Worker, compute_geometry, geometry_copy, apply_geometry, layout_copy, picture_copy
+from history import History
+import stats
 import re
+import sys
 
 class Window:
     '''
@@ -15,24 +26,44 @@ class Window:
 
     Methods beginning with _ make some tkinter gui widgets.
     view_popup is auxiliary method that makes popup bindings work.
-    clear_all clears all.
+    clear_all clears all. set_culling turns on and off drawing of only visible part of graph.
+    set_bundling turns on and off drawing of big families of parallel ribs as bundles, expand_bundle (double click on bundle) and collapse_bundle (rib popup) show and hide ribs of one bundle.
     set_color takes as parameters some color variables and buttons which manage them. It is called by lambdas bound to buttons and works with default colours.
-    item_color_configure works with vertices, outlines, ribs and weight texts. It's cool. It's called by popups.
-    get_vertex and get_rib are efficient methods that use canvas methods to find nearest element.
-    find_vertex is inefficient method for some things that don't want to work correct other way.
+    item_color_configure works with vertices, outlines, ribs and weight texts. It's cool. It's called by popups. It gets name of graph colour dict, so the change can be recorded.
+    get_vertex uses canvas methods to find nearest element.
+    find_vertex and get_rib use spatial indexes of graph (DictGraph.find_vertex and DictGraph.find_rib), so they don't depend on graph size.
+    Event coordinates are window coordinates, point converts them to canvas (and graph) coordinates, which differ after scrolling.
     create_graph and edit_graph are functions that create editing frame and turn on special binding mode. finish_function returns this back.
-    add_vertices_mode and add_ribs_mode make different canvas reactions on click.
+    add_vertices_mode and add_ribs_mode make different canvas reactions on click. They only set self.mode, events of all vertices and ribs are bound once to class tags
+    of canvas items ('vertex', 'rib', 'weight', see GraphCanvas), so switching of mode doesn't depend on graph size. vertex_press and vertex_motion choose reaction by self.mode.
     set_vertex and set_rib interact with window default variables and DictGraph object simultaneously.
-    delete_rib_by_id and delete_vertex_by_name are called by popup_deleting or cancel function.
-    cancel function implemented using stack.
+    delete_rib_by_id and delete_vertex_by_name are called by popup_deleting.
+    Every edit is recorded in self.history (history module) as small operations, undo and redo (buttons, edit menu, Ctrl+Z and Ctrl+Y) apply them by apply_op.
+    do records operations and applies them, edits which are done other way (adding vertices and ribs, resizing) only record them. After operations canvas is only refreshed,
+    so undo of one edit doesn't depend on graph size. Dragging of vertex is one operation. History is cleared when other graph is opened.
+    vertex_ops and rib_op make operations for vertex and rib which are deleted or added.
     popup_deleting finds vertex or rib from event and calls some delete function.
-    name_check, vertex_bindings and rib_bindings are auxiliary functions.
-    save and download use pickle module.
-    move_vertex_start and move_vertex_stop just move vertex. Nothing unusual.
+    self.names is NameAllocator which gives names to new vertices during creating or editing (None otherwise), deleted and renamed vertices release their names.
+    save and download use graphfile module, download opens only graph files. Old pickle files are converted by convert_old_file (graphfile.convert) after the user agrees,
+    as pickle can run code written in the file.
+    import_graph and export_graph use graphio module. export_picture draws graph to SVG file (svg module).
+    layout_graph places vertices of current graph by force-directed layout (layout module).
+    analysis menu runs algorithms module in background (analyse), show_components, show_ribs and show_check show results by graph colours or alert.
+    set_path_start and find_path (vertex popup) colour the shortest path between two vertices.
+    Opening, importing, layout, random graph and geometry of big vertices are computed by self.worker in background thread (start_task), so window isn't blocked.
+    Functions ending with _task are run in that thread and don't touch widgets, show_opened, show_imported, set_layout and show_random_graph get their results in tkinter thread.
+    Geometry of the shown graph is computed for its copy (worker.geometry_copy), so the graph can be edited and drawn meanwhile, show_geometry puts it into the graph
+    (worker.apply_geometry) unless the graph has been changed, then the graph computes geometry itself when it is drawn.
+    Progress of the task is shown in progress frame (show_progress), cancel_task stops it. Only one task runs at once.
+    drag_vertex, show_drag and drop_vertex move vertex by mouse. Motion events are only remembered and the canvas shows the last of them once per frame (self.frame_time ms),
+    GraphCanvas.drag_to moves vertex and bends its ribs without recomputing geometry. drop_vertex moves vertex in graph (one history operation), so geometry is recomputed once.
     change_vertex_by_popup is used by lambda functions bound to popups and calls some function from rename_complete and resize_complete for vertices. All this metods is needed for widgets management and they call other methods to change graph. There are some functional programming here.
     reweigh_rib_by_event calls reweigh_complete which calls reweigh_rib. There are no functional programming here.
     rename_vertex, resize_vertex and reweigh_rib interact only with DictGraph object and GraphCanvas object and no other widgets or intern variables.
+    redraw_vertex recomputes geometry of ribs of moved or resized vertex and redraws only this vertex and its ribs.
     random_graph makes top level window with options and start_command does   other work for creating and viewing random graph.
+    show_stats turns on instrumentation (stats module) and shows the slowest operations and canvas item counts over the canvas, update_stats refreshes it twice a second.
+    save_stats writes statistics to JSON file. Instrumentation started with --stats option measures all handlers and stays on when the overlay is hidden.
 
     '''
     def __init__(self, g = None):
@@ -53,12 +84,23 @@ class Window:
         self.directed.set(1)
         self.multigraph.set(1)
         self.weighted.set(1)
+        self.culling = IntVar()
+        self.bundling = IntVar()
+        self.stats_shown = IntVar()
+        self.stats_started = stats.enabled()
+        self.stats_label = None
+        self.stats_job = None
         # self.creating = 0
-        self.names = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z']
-        self.next_name = None
+        self.names = None
+        self.path_start = None
+        self.mode = None  # 'vertices' or 'ribs' while graph is edited
 
         self.next = None
-        self.cancel_stack = []
+        self.dragged = None
+        self.drag_position = None
+        self.drag_frame = None
+        self.frame_time = 16  # about 60 frames per second
+        self.history = History(depth = 1000)  # number of edits which can be undone
         self.event = None
 
         self.ask_vers = IntVar()
@@ -66,18 +108,28 @@ class Window:
         self.entry = None
 
         self._make_widgets()
+        self.worker = Worker(self.root)
+        self.background_limit = 5000  # smaller computations aren't worth a background task
         mainloop()
+        self.worker.shutdown()
 
     def _make_widgets(self):
         self._make_menu()
 
         self._make_top_frame()
         self._make_create_frame()
+        self._make_progress_frame()
 
         # self.canvas_frame = Frame(self.root)
         # self.canvas_frame.grid(row = 2, column = 0)
         self.canvas = GraphCanvas(self.root, width=600, height=400, scrollregion=(0, 0, 600, 400)) ##
         self.canvas.grid(row = 1, column = 0, sticky=N+S+E+W)
+        self.canvas.tag_bind('bundle', '<Double-Button-1>', self.expand_bundle)
+        self.canvas.tag_bind('vertex', '<Button-1>', self.vertex_press)
+        self.canvas.tag_bind('vertex', '<B1-Motion>', self.vertex_motion)
+        self.canvas.tag_bind('vertex', '<Button-3>', lambda ev: self.view_popup(ev, self.vertex_popup_menu))
+        self.canvas.tag_bind('rib', '<Button-3>', lambda ev: self.view_popup(ev, self.rib_popup_menu))
+        self.canvas.tag_bind('weight', '<Double-Button-1>', self.reweigh_rib_by_event)
         self.y_scrollbar = Scrollbar(self.root, command = self.canvas.yview, orient=VERTICAL)
         self.x_scrollbar = Scrollbar(self.root, command = self.canvas.xview, orient=HORIZONTAL)
         self.canvas.configure(yscrollcommand = self.y_scrollbar.set, xscrollcommand = self.x_scrollbar.set)
@@ -102,14 +154,34 @@ class Window:
         self.file_menu.add_command(label='new random graph', command=self.random_graph)
         self.file_menu.add_command(label='open', command=self.download)
         self.file_menu.add_command(label='save as', command=self.save)
+        self.file_menu.add_command(label='convert old file', command=self.convert_old_file)
+        self.file_menu.add_command(label='import edge list, GraphML or DOT', command=self.import_graph)
+        self.file_menu.add_command(label='export edge list, GraphML or DOT', command=self.export_graph)
+        self.file_menu.add_command(label='export picture (SVG)', command=self.export_picture)
         self.menubar.add_cascade(label='file', menu=self.file_menu)
 
         self.edit_menu = Menu(self.menubar, tearoff=0)
+        self.edit_menu.add_command(label = 'undo', accelerator = 'Ctrl+Z', command = self.undo)
+        self.edit_menu.add_command(label = 'redo', accelerator = 'Ctrl+Y', command = self.redo)
         self.edit_menu.add_command(label = 'clear all', command = self.clear_all)
         self.edit_menu.add_command(label='edit graph', command = self.edit_graph)
+        self.edit_menu.add_command(label='lay out', command = self.layout_graph)
+        self.edit_menu.add_checkbutton(label='draw only visible part', variable = self.culling, command = self.set_culling)
+        self.edit_menu.add_checkbutton(label='bundle parallel ribs', variable = self.bundling, command = self.set_bundling)
+        self.edit_menu.add_checkbutton(label='show statistics', variable = self.stats_shown, command = self.show_stats)
+        self.edit_menu.add_command(label='save statistics', command = self.save_stats)
         self.menubar.add_cascade(label='edit', menu=self.edit_menu)
 
+        self.analysis_menu = Menu(self.menubar, tearoff=0)
+        self.analysis_menu.add_command(label='connected components', command = lambda: self.analyse('components', algorithms.connected_components, self.show_components, 0))
+        self.analysis_menu.add_command(label='strongly connected components', command = lambda: self.analyse('components', algorithms.strongly_connected_components, self.show_components))
+        self.analysis_menu.add_command(label='minimum spanning tree', command = lambda: self.analyse('spanning tree', algorithms.minimum_spanning_tree, self.show_ribs, 0))
+        self.analysis_menu.add_command(label='tree, cycle and Euler cycle check', command = lambda: self.analyse('checking', self.check_task, self.show_check, None, 0))
+        self.menubar.add_cascade(label='analysis', menu=self.analysis_menu)
+
         self.root.config(menu=self.menubar)
+        self.root.bind('<Control-z>', lambda ev: self.undo())
+        self.root.bind('<Control-y>', lambda ev: self.redo())
 
     def _make_top_frame(self):
         self.top_frame = Frame(self.root)
@@ -196,25 +268,40 @@ class Window:
         self.add_vertices_button.grid(row = 0, column = 0)
         self.add_ribs_button = Button(self.create_frame, text = 'add ribs', command = self.add_ribs_mode)
         self.add_ribs_button.grid(row = 0, column = 1)
-        self.cancel_button = Button(self.create_frame, text='cancel', state=DISABLED, command = self.cancel)
-        self.cancel_button.grid(row = 0, column = 2)
+        self.undo_button = Button(self.create_frame, text='undo', state=DISABLED, command = self.undo)
+        self.undo_button.grid(row = 0, column = 2)
+        self.redo_button = Button(self.create_frame, text='redo', state=DISABLED, command = self.redo)
+        self.redo_button.grid(row = 0, column = 3)
         self.complete_button = Button(self.create_frame, text = 'complete', command = self.finish_function)
-        self.complete_button.grid(row = 0, column = 3)
+        self.complete_button.grid(row = 0, column = 4)
+
+    def _make_progress_frame(self):
+        self.progress_frame = Frame(self.top_frame)
+        # self.progress_frame.grid(row=1, column=2, sticky='wn')
+        self.progress_label = Label(self.progress_frame)
+        self.progress_label.grid(row = 0, column = 0)
+        self.progress_bar = Progressbar(self.progress_frame, length = 150, maximum = 1)
+        self.progress_bar.grid(row = 0, column = 1)
+        self.progress_cancel_button = Button(self.progress_frame, text = 'stop', command = self.cancel_task)
+        self.progress_cancel_button.grid(row = 0, column = 2)
 
     def _make_vertex_popup(self):
         self.vertex_popup_menu = Menu(self.root, tearoff=0)
         self.vertex_popup_menu.add_command(label='delete', command = lambda: self.popup_deleting(self.get_vertex, self.delete_vertex_by_name))
         self.vertex_popup_menu.add_command(label='rename', command = lambda: self.change_vertex_by_popup(StringVar(), self.rename_complete)) #self.rename_vertex)
         self.vertex_popup_menu.add_command(label = 'resize', command = lambda: self.change_vertex_by_popup(IntVar(), self.resize_complete, self.g.ver_sizes))
-        self.vertex_popup_menu.add_command(label='colour', command = lambda: self.item_color_configure(self.get_vertex, self.g.ver_colours, 0))
-        self.vertex_popup_menu.add_command(label='outline colour', command = lambda: self.item_color_configure(self.get_vertex, self.g.ver_colours, 1))
+        self.vertex_popup_menu.add_command(label='colour', command = lambda: self.item_color_configure(self.get_vertex, 'ver_colours', 0))
+        self.vertex_popup_menu.add_command(label='outline colour', command = lambda: self.item_color_configure(self.get_vertex, 'ver_colours', 1))
+        self.vertex_popup_menu.add_command(label='path from here', command = self.set_path_start)
+        self.vertex_popup_menu.add_command(label='path to here', command = self.find_path)
 
     def _make_rib_popup(self):
         self.rib_popup_menu = Menu(self.root, tearoff=0)
         self.rib_popup_menu.add_command(label='delete', command = lambda: self.popup_deleting(self.get_rib, self.delete_rib_by_id))
         self.rib_popup_menu.add_command(label='re-weigh', command=self.reweigh_rib_by_event)
-        self.rib_popup_menu.add_command(label='colour', command = lambda: self.item_color_configure(self.get_rib, self.g.rib_colours))
-        self.rib_popup_menu.add_command(label='weight colour', command = lambda: self.item_color_configure(self.get_rib, self.g.weight_colours))
+        self.rib_popup_menu.add_command(label='colour', command = lambda: self.item_color_configure(self.get_rib, 'rib_colours'))
+        self.rib_popup_menu.add_command(label='weight colour', command = lambda: self.item_color_configure(self.get_rib, 'weight_colours'))
+        self.rib_popup_menu.add_command(label='collapse parallel ribs', command = self.collapse_bundle)
 
     def view_popup(self, ev, popup_menu):
         self.event = ev
@@ -222,7 +309,53 @@ class Window:
 
     def clear_all(self):
         self.g = None
-        self.canvas.delete('all')
+        self.canvas.clear_graph()
+        self.clear_history()
+
+    def set_culling(self):
+        self.canvas.culling = self.culling.get()
+        if self.g:
+            self.canvas.view_graph(self.g)
+
+    def set_bundling(self):
+        self.canvas.bundling = self.bundling.get()
+        self.canvas.expanded = set()
+        if self.g:
+            self.canvas.view_graph(self.g)
+
+    def expand_bundle(self, ev):
+        key = self.canvas.bundle_at(self.canvas.find_withtag('current')[0])
+        if key:
+            self.canvas.expand(self.g, key)
+
+    def collapse_bundle(self):
+        i = self.get_rib(self.event)
+        if i:
+            rib = self.g.ribs.get(i)
+            self.canvas.collapse(self.g, pair(rib[0], rib[1]))
+
+    def show_stats(self):
+        if self.stats_shown.get():
+            stats.enable()
+            self.stats_label = Label(self.canvas, justify = LEFT, font = ('TkFixedFont', 9), bg = '#ffffe0')
+            self.stats_label.place(x = 5, y = 5)
+            self.update_stats()
+        else:
+            self.root.after_cancel(self.stats_job)
+            self.stats_label.destroy()
+            self.stats_label = None
+            if not self.stats_started:
+                stats.disable()
+
+    def update_stats(self):
+        text = stats.summary(self.canvas)
+        self.stats_label.configure(text = '{}\ncanvas items {}'.format(text, len(self.canvas.find_all())))
+        self.stats_job = self.root.after(500, self.update_stats)
+
+    def save_stats(self):
+        filename = asksaveasfilename()
+        if filename:
+            stats.dump(filename, self.canvas)
 
     def set_color(self, variable, button):
         col = askcolor()
@@ -230,119 +363,191 @@ class Window:
             variable.set(col[1])
             button.configure(bg = variable.get())
 
-    def item_color_configure(self, find_function, graph_colours_dict, index = -1):
+    def item_color_configure(self, find_function, dict_name, index = -1):
         n = find_function(self.event)
         self.event = None
+        if not n:
+            return
         col = askcolor()[1]
         if col:
+            old = getattr(self.g, dict_name).get(n)
             if index != -1:
-                cort = list(graph_colours_dict.get(n))
+                cort = list(old)
                 cort[index] = col
-                graph_colours_dict[n] = tuple(cort)
-                self.canvas.view_vertex(self.g, n)
-            else:
-                graph_colours_dict[n] = col
-                self.canvas.view_rib(self.g, n)
-                self.canvas.view_rib_weight(self.g, n)
+                col = tuple(cort)
+            self.do(('colour', dict_name, n, old, col))
+
+    def point(self, ev):
+        return self.canvas.canvasx(ev.x), self.canvas.canvasy(ev.y)
 
-    def find_vertex(self, ev, size = 0): #####
+    def find_vertex(self, ev, size = 0):
         if not size:
             size = self.default_v_size.get()
-        n = 0
-        for name, coor in self.g.form.items():
-            x, y = coor[0], coor[1]
-            if x - size <= ev.x <= x + size and y - size <= ev.y <= y + size:
-                n = name
-                break
-        return n
+        return self.g.find_vertex(*self.point(ev), size)
 
     def get_vertex(self, ev):
-        tag = self.canvas.gettags(self.canvas.find_closest(ev.x, ev.y))[0]
-        if 'rib' in tag or 'weight' in tag:
+        item = self.canvas.find_closest(*self.point(ev))
+        if 'vertex' not in self.canvas.gettags(item):
             return 0
-        return tag
+        return self.canvas.item_owner(item)
 
     def get_rib(self, ev):
-        tag = self.canvas.gettags(self.canvas.find_closest(ev.x, ev.y))[0]
-        # tag = self.canvas.gettags(ev.widget.find_withtag("current"))[0]
-        i = int(tag[3:])
-        return i
+        return self.g.find_rib(*self.point(ev))
 
     def create_graph(self):
-        self.canvas.delete('all')
+        self.canvas.clear_graph()
         self.g = DictGraph()
         self.g.directed, self.g.weighted, self.g.multigraph = self.directed.get(), self.weighted.get(), self.multigraph.get()
+        self.clear_history()
 
         self.create_frame.grid(row=1, column=1, sticky='wn')
 
-        self.next_name = (name for name in self.names)
+        self.names = NameAllocator()
         self.add_vertices_mode()
 
     def edit_graph(self):
         if self.g:
             self.create_frame.grid(row=1, column=1, sticky='wn')
 
-            self.next_name = (name for name in [e for e in self.names if e not in self.g.vertices.keys()])
+            self.names = NameAllocator(self.g.vertices)
             self.add_vertices_mode()
         else:
-            alert = Toplevel()
-            message = Message(alert, width = 200, text = 'You have no any graph opened. Please, create or download some graph.')
-            button = Button(alert, text = 'ok', command = lambda: alert.destroy())
-            message.grid(row = 0, column = 0)
-            button.grid(row = 1, column = 0)
-            alert.bind('<Return>', lambda ev: alert.destroy())
-            alert.focus()
+            self.alert('You have no any graph opened. Please, create or download some graph.')
+
+    def alert(self, text):
+        alert = Toplevel()
+        message = Message(alert, width = 200, text = text)
+        button = Button(alert, text = 'ok', command = lambda: alert.destroy())
+        message.grid(row = 0, column = 0)
+        button.grid(row = 1, column = 0)
+        alert.bind('<Return>', lambda ev: alert.destroy())
+        alert.focus()
 
     def add_vertices_mode(self):
         self.add_vertices_button.configure(relief=SUNKEN)
         self.add_ribs_button.configure(relief=RAISED)
         self.canvas.bind('<Button-1>', self.set_vertex)
-        for e in self.g.vertices.keys():
-            self.vertex_bindings(e)
-            self.canvas.tag_bind(e, '<Button-1>', lambda ev: None)
+        self.mode = 'vertices'
 
     def add_ribs_mode(self):
         self.add_vertices_button.configure(relief=RAISED)
         self.add_ribs_button.configure(relief=SUNKEN)
         self.next = None
         self.canvas.bind('<Button-1>', lambda ev: None)
-        for e in self.g.vertices.keys():
-            self.canvas.tag_bind(e, '<B1-Motion>', self.set_rib)
-            self.canvas.tag_bind(e, '<Button-1>', self.set_rib)
-
-    def cancel(self):
-        if self.cancel_stack:
-            el = self.cancel_stack.pop()
-            if type(el) is int:
-                self.delete_rib_by_id(el)
-            if type(el) is str:
-                self.delete_vertex_by_name(el)
-        if not self.cancel_stack:
-            self.cancel_button.configure(state = DISABLED)
+        self.mode = 'ribs'
+
+    def vertex_press(self, ev):
+        if self.mode == 'ribs':
+            self.set_rib(ev)
+
+    def vertex_motion(self, ev):
+        if self.mode == 'ribs':
+            self.set_rib(ev)
+        else:
+            self.drag_vertex(ev)
+
+    def do(self, *ops):
+        self.history.add(*ops)
+        for op in ops:
+            self.apply_op(op)
+        self.canvas.refresh(self.g)
+        self.show_history()
+
+    def undo(self):
+        if self.g:
+            self.replay(self.history.undo())
+
+    def redo(self):
+        if self.g:
+            self.replay(self.history.redo())
+
+    def replay(self, ops):
+        for op in ops:
+            self.apply_op(op)
+        self.canvas.refresh(self.g)
+        self.show_history()
+
+    def show_history(self):
+        self.undo_button.configure(state = NORMAL if self.history.done else DISABLED)
+        self.redo_button.configure(state = NORMAL if self.history.undone else DISABLED)
+
+    def clear_history(self):
+        self.history.clear()
+        self.show_history()
+
+    def apply_op(self, op):
+        # changes graph and marks changed items, canvas is refreshed by caller
+        kind, g = op[0], self.g
+        if kind == 'add_vertex':
+            name, coor, size, colours = op[1:]
+            g.set_vertices(name)
+            g.move_vertex(name, coor)
+            g.ver_sizes[name] = size
+            g.ver_colours[name] = colours
+            self.canvas.view_vertex(g, name)
+            if self.names:
+                self.names.use(name)
+        elif kind == 'del_vertex':
+            name = op[1]
+            self.canvas.delete_ribs(g, name)
+            self.canvas.delete_vertex(name)
+            g.del_vertex(name)
+            if self.names:
+                self.names.release(name)
+        elif kind == 'add_rib':
+            i, a, b, w, dir, colour, weight_colour, place = op[1:]
+            g.restore_rib(i, a, b, w, dir, place)
+            g.rib_colours[i] = colour
+            g.weight_colours[i] = weight_colour
+            self.canvas.mark_rib(i)
+        elif kind == 'del_rib':
+            g.del_rib(op[1])
+            self.canvas.delete_rib(op[1])
+        elif kind == 'move':
+            g.move_vertex(op[1], op[3])
+            self.canvas.mark_vertex(op[1])
+        elif kind == 'resize':
+            g.resize_vertex(op[1], op[3])
+            self.canvas.mark_vertex(op[1])
+        elif kind == 'reweigh':
+            g.reweigh_rib(op[1], op[3])
+        elif kind == 'colour':
+            dict_name, key, new = op[1], op[2], op[4]
+            getattr(g, dict_name)[key] = new
+            if dict_name == 'ver_colours':
+                self.canvas.mark_vertex(key)
+            else:
+                self.canvas.mark_rib(key)
+        elif kind == 'rename':
+            old, new = op[1:]
+            g.rename_vertex(old, new)
+            self.canvas.delete_vertex(old)
+            self.canvas.view_vertex(g, new)
+            if self.names:
+                self.names.release(old)
+                self.names.use(new)
+
+    def vertex_ops(self, kind, name):
+        return (kind, name, tuple(self.g.form.get(name)), self.g.ver_sizes.get(name), self.g.ver_colours.get(name))
+
+    def rib_op(self, kind, i, place = None):
+        # place of rib in its family is needed to put it back
+        a, b, w, dir = self.g.ribs.get(i)
+        if place is None:
+            place = list(self.g.pairs.get(pair(a, b))).index(i)
+        return (kind, i, a, b, w, frozenset(dir), self.g.rib_colours.get(i), self.g.weight_colours.get(i), place)
 
     def set_vertex(self, ev):
         if not self.find_vertex(ev):
-            try:
-                name = next(self.next_name)
-                self.g.set_vertices(name)
-                x = ev.x
-                y = ev.y
-                self.g.form[name] = (x, y)
-                self.g.ver_sizes[name] = self.default_v_size.get()
-                self.g.ver_colours[name] = (self.default_col_v_fill.get(), self.default_col_v_outline.get())
-                self.canvas.view_vertex(self.g, name)
-                self.vertex_bindings(name)
-                if not self.cancel_stack:
-                    self.cancel_button.configure(state=NORMAL)
-                self.cancel_stack.append(name)
-            except:
-                alert = Toplevel()
-                message = Message(alert, text = 'You used the whole alphabet. Try to rename some vertices.', width = 400)
-                button = Button(alert, text = 'ok',  command = lambda: alert.destroy())
-                message.grid(row=0, column=0)
-                button.grid(row=1, column=0)
-                alert.bind('<Return>', lambda ev: alert.destroy())
-                alert.focus()
+            name = self.names.take()
+            self.g.set_vertices(name)
+            x, y = self.point(ev)
+            self.g.move_vertex(name, (x, y))
+            self.g.ver_sizes[name] = self.default_v_size.get()
+            self.g.ver_colours[name] = (self.default_col_v_fill.get(), self.default_col_v_outline.get())
+            self.canvas.view_vertex(self.g, name)
+            self.history.add(self.vertex_ops('add_vertex', name))
+            self.show_history()
 
     def set_rib(self, ev):
         n = self.find_vertex(ev)
@@ -355,31 +560,20 @@ class Window:
                     i = self.g.set_rib(self.next, n, dir = dir) # w ???
                     self.g.rib_colours[i] = self.default_col_r.get()
                     self.g.weight_colours[i] = self.default_col_weight.get()
-                    self.canvas.view_rib(self.g, i)
-                    if self.g.weighted:
-                        self.canvas.view_rib_weight(self.g, i)
-
-                    self.rib_bindings(i)
-                    if not self.cancel_stack:
-                        self.cancel_button.configure(state=NORMAL)
-                    self.cancel_stack.append(i)
+                    self.canvas.mark_rib(i)
+                    self.canvas.refresh(self.g)
+
+                    self.history.add(self.rib_op('add_rib', i, self.g.rib_count(self.next, n) - 1))
+                    self.show_history()
                     self.next = None
             else:
                 self.next = n
 
     def finish_function(self):
         self.create_frame.grid_remove()
-        self.cancel_stack = []
-        self.cancel_button.configure(state=DISABLED)
         self.canvas.bind('<Button-1>', lambda ev: None)
-        for e in self.g.vertices.keys():
-            self.vertex_bindings(e)
-            self.canvas.tag_bind(e, '<Button-1>', lambda ev: None)
-        self.next_name = None
-
-    def name_check(self):
-        if self.next_name:
-            self.next_name = (name for name in [e for e in self.names if e not in self.g.vertices.keys()])
+        self.mode = None
+        self.names = None
 
     def random_graph(self):
         self.ask = Toplevel()
@@ -400,7 +594,15 @@ class Window:
         self.ask.bind('<Return>', self.start_command)
         self.ask.focus()
     def start_command(self):
-        self.g = random_graph(self.ask_vers.get(), self.ask_ribs.get(), weighted = self.weighted.get(), directed = self.directed.get(), multigraph = self.multigraph.get())
+        v, r = self.ask_vers.get(), self.ask_ribs.get()
+        weighted, directed, multigraph = self.weighted.get(), self.directed.get(), self.multigraph.get()
+        self.start_task('random graph', lambda task: random_graph(v, r, weighted = weighted, directed = directed, multigraph = multigraph), done = self.show_random_graph)
+        self.ask.destroy()
+
+    def show_random_graph(self, g):
+        self.g = g
+        self.clear_history()
+        self.fit_scrollregion(g)
         c1 = random_color()
         self.default_col_v_fill.set(c1)
         c2 = random_color()
@@ -418,78 +620,261 @@ class Window:
         self.g.weight_colours = {e: c1 for e in self.g.ribs.keys()}
 
         self.canvas.view_graph(self.g)
-        for e in self.g.vertices.keys():
-            self.vertex_bindings(e)
-        for i in self.g.ribs.keys():
-            self.rib_bindings(i)
-
-        self.ask.destroy()
-
-    def vertex_bindings(self, ver):
-        self.canvas.tag_bind(ver, '<Button-3>', lambda ev: self.view_popup(ev, self.vertex_popup_menu))
-        self.canvas.tag_bind(ver, '<B1-Motion>', self.move_vertex_start)
-    def rib_bindings(self, i):
-        self.canvas.tag_bind('rib' + str(i), '<Button-3>', lambda ev: self.view_popup(ev, self.rib_popup_menu))
-        self.canvas.tag_bind('weight' + str(i), '<Double-Button-1>', self.reweigh_rib_by_event)
 
     def save(self):
         try:
             filename = asksaveasfilename()
-            f = open(filename, 'wb')
-            pickle.dump(self.g, f)
+            graphfile.save(self.g, filename)
         except:
             pass
 
     def download(self):
+        filename = askopenfilename()
+        if filename:
+            if not graphfile.is_graph_file(filename):
+                self.alert('It is not a graph file. Files saved by old versions can be opened by "convert old file".')
+                return
+            self.start_task('opening', self.open_task, filename, done = self.show_opened)
+
+    def open_task(self, task, filename):
+        g = graphfile.load(filename)
+        return compute_geometry(task, g)
+
+    def convert_old_file(self):
+        source = askopenfilename()
+        if not source:
+            return
+        if graphfile.is_graph_file(source):
+            self.alert('It is a graph file already, it can be opened.')
+            return
+        if not askyesno('convert old file', 'Old files are read by pickle, which can run any code written in the file. Convert it only if you have saved it yourself.'):
+            return
+        filename = asksaveasfilename()
+        if filename:
+            self.start_task('converting', self.convert_task, source, filename, done = self.show_opened)
+
+    def convert_task(self, task, source, filename):
+        graphfile.convert(source, filename)
+        return self.open_task(task, filename)
+
+    def show_opened(self, g):
+        self.g = g
+        self.clear_history()  # layout isn't recorded, so old moves are forgotten too
+        self.canvas.view_graph(self.g)
+
+    def import_graph(self):
+        filename = askopenfilename()
+        if filename:
+            report = {}
+            self.start_task('importing', self.import_task, filename, report, done = lambda g: self.show_imported(g, report))
+
+    def import_task(self, task, filename, report):
+        g = graphio.load(filename, read_progress = task.progress, report = report)
+        if not g.form:
+            graphio.place_on_grid(g)
+        return compute_geometry(task, g)
+
+    def show_imported(self, g, report):
+        self.g = g
+        self.clear_history()
+        self.canvas.view_graph(self.g)
+        if report.get('loops'):
+            self.root.title('{} self-loops skipped'.format(report['loops']))
+
+    def layout_graph(self):
+        if self.g and self.g.vertices:
+            g = self.g
+            self.start_task('layout', self.layout_task, layout_copy(g), done = lambda form: self.set_layout(g, form))
+
+    def layout_task(self, task, g):
+        names = sorted(g.vertices)
+        return dict(zip(names, layout.compute_form(g, progress = task.progress)))
+
+    def set_layout(self, g, form):
+        # vertices added during layout keep their places, vertices which have no place at all are skipped
+        if g is not self.g:
+            return
+        names = [name for name in sorted(g.vertices) if form.get(name) or g.form.get(name)]
+        if len(names) == len(g.vertices):
+            g.set_form(*[form.get(name) or g.form.get(name) for name in names])
+        else:
+            for name in names:
+                g.move_vertex(name, form.get(name) or g.form.get(name))
+        self.clear_history()  # layout isn't recorded, so old moves are forgotten too
+        self.fit_scrollregion(g)
+        self.start_task('geometry', compute_geometry, geometry_copy(g), done = lambda copy: self.show_geometry(g, copy))
+
+    def show_geometry(self, g, copy, name = None):
+        # the whole graph is redrawn after layout, only vertex and its ribs after resizing
+        if g is not self.g:
+            return
+        apply_geometry(g, copy)
+        if name is None:
+            self.canvas.view_graph(g)
+        else:
+            self.redraw_vertex(name)
+
+    def fit_scrollregion(self, g):
+        if g.form:
+            right = max(coor[0] for coor in g.form.values()) + 50
+            bottom = max(coor[1] for coor in g.form.values()) + 50
+            self.canvas.configure(scrollregion = (0, 0, max(self.width.get(), right), max(self.height.get(), bottom)))
+
+    def start_task(self, text, func, *args, done = None):
+        # only one task at once: previous one is cancelled
+        self.worker.cancel()
+        self.progress_label.configure(text = text)
+        self.progress_bar['value'] = 0
+        self.progress_frame.grid(row=1, column=2, sticky='wn')
+
+        def finish(result):
+            self.progress_frame.grid_remove()
+            done(result)
+
+        def fail(error):
+            self.progress_frame.grid_remove()
+            self.root.title('{} failed: {}'.format(text, error))
+
+        return self.worker.run(func, *args, done = finish, failed = fail, progress = self.show_progress)
+
+    def cancel_task(self):
+        self.worker.cancel()
+        self.progress_frame.grid_remove()
+
+    def show_progress(self, part):
+        self.progress_bar['value'] = part
+
+    def analyse(self, text, func, show, *directions):
+        # snapshots of the graph (g.snapshot for every direction, default one by default) are made in tkinter thread and algorithm gets only them in background thread
+        if not self.g:
+            self.alert('You have no any graph opened. Please, create or download some graph.')
+            return
+        g = self.g
+        snapshots = [g.snapshot(directed) for directed in directions or [None]]
+        self.start_task(text, self.analysis_task, func, *snapshots, done = lambda result: self.show_analysis(g, snapshots[0], show, result))
+
+    def analysis_task(self, task, func, *args):
+        task.check()
+        return func(*args)
+
+    def show_analysis(self, g, s, show, *result):
+        # result is shown only if the graph is still opened and hasn't changed since snapshot was made
+        if g is self.g and s.version == g.version:
+            show(*result)
+
+    def check_task(self, s, undirected):
+        return algorithms.is_tree(undirected), algorithms.has_cycle(s), algorithms.is_oil(undirected)
+
+    def show_check(self, result):
+        tree, cycle, oil = result
+        self.alert('tree: {}\ncycle: {}\nEuler cycle: {}'.format(*['yes' if e else 'no' for e in (tree, cycle, oil)]))
+
+    def show_components(self, components):
+        algorithms.colour_components(self.g, components)
+        self.canvas.view_graph(self.g)
+        self.root.title('{} components'.format(len(components)))
+
+    def show_ribs(self, ribs):
+        # found ribs are coloured and redrawn, other ones keep their colours
+        algorithms.colour_ribs(self.g, ribs)
+        for i in ribs:
+            self.canvas.mark_rib(i)
+        self.canvas.refresh(self.g)
+
+    def set_path_start(self):
+        self.path_start = self.get_vertex(self.event)
+        self.event = None
+
+    def find_path(self):
+        end = self.get_vertex(self.event)
+        self.event = None
+        if not end:
+            return
+        if self.path_start not in self.g.vertices:
+            self.alert('Choose the start of the path by "path from here".')
+            return
+        start = self.path_start
+        g = self.g
+        s = g.snapshot()
+        self.start_task('path', self.analysis_task, algorithms.shortest_path, s, start, end, done = lambda result: self.show_analysis(g, s, self.show_path, start, end, *result))
+
+    def show_path(self, start, end, length, ribs):
+        if length is None:
+            self.alert('There is no path from {} to {}.'.format(start, end))
+            return
+        self.show_ribs(ribs)
+        self.root.title('path from {} to {}: {:g}'.format(start, end, length))
+
+    def export_graph(self):
         try:
-            filename = askopenfilename()
-            f = open(filename, 'rb')
-            self.g = pickle.load(f)
-            self.g.view()
-            self.canvas.view_graph(self.g)
+            filename = asksaveasfilename()
+            graphio.save(self.g, filename)
         except:
             pass
 
+    def export_picture(self):
+        if self.g:
+            filename = asksaveasfilename(defaultextension = '.svg')
+            if filename:
+                self.start_task('export', self.export_task, picture_copy(self.g), filename, done = lambda result: None)
+
+    def export_task(self, task, g, filename):
+        svg.save(g, filename)
 
     def delete_rib_by_id(self, i):
-        self.g.del_rib(i)
-        self.canvas.delete_rib(i)
+        # parallel ribs after the deleted one change their places in the family and are redrawn by refresh
+        self.do(self.rib_op('del_rib', i))
 
     def delete_vertex_by_name(self, name):
-        self.canvas.delete_ribs(self.g, name)
-        self.canvas.delete_vertex(name)
-        self.g.del_vertex(name)
-        self.name_check()
+        # all ribs of family are deleted from the last one, so undo puts them back in the same order
+        ops = []
+        for key in {pair(self.g.ribs.get(i)[0], self.g.ribs.get(i)[1]): None for i in self.g.vertices.get(name)}:
+            family = list(self.g.pairs.get(key))
+            for place in range(len(family) - 1, -1, -1):
+                ops.append(self.rib_op('del_rib', family[place], place))
+        ops.append(self.vertex_ops('del_vertex', name))
+        self.do(*ops)
 
     def popup_deleting(self, find_function, delete_function):
         n = find_function(self.event)
-        delete_function(n)
+        if n:
+            delete_function(n)
         self.event = None
 
 
-    def move_vertex_start(self, ev):
-        if self.next:
-            self.canvas.bind('<ButtonRelease-1>', self.move_vertex_stop) ### ??
+    def drag_vertex(self, ev):
+        if not self.dragged:
+            name = self.canvas.item_owner()  # vertex under the mouse is found only at the start of drag
+            if name not in self.g.vertices:
+                return
+            self.dragged = name
+            self.canvas.drag_start(self.g, name)
+            self.canvas.bind('<ButtonRelease-1>', self.drop_vertex)
+        self.drag_position = self.point(ev)
+        if not self.drag_frame:
+            self.drag_frame = self.root.after(self.frame_time, self.show_drag)
+
+    def show_drag(self):
+        self.drag_frame = None
+        if self.dragged:
+            self.canvas.drag_to(*self.drag_position)
+
+    def drop_vertex(self, ev):
+        self.canvas.unbind('<ButtonRelease-1>')
+        if self.drag_frame:
+            self.root.after_cancel(self.drag_frame)
+            self.drag_frame = None
+        name, self.dragged = self.dragged, None
+        self.canvas.drag_stop()
+        other = self.find_vertex(ev, self.g.ver_sizes.get(name))
+        if other and other != name:
+            # place is occupied, vertex and its ribs are drawn on the old place
+            self.canvas.mark_vertex(name)
+            for i in self.g.vertices.get(name):
+                self.canvas.mark_rib(i)
+            self.canvas.refresh(self.g)
         else:
-            self.next = self.get_vertex(ev)
-
-    def move_vertex_stop(self, ev):
-        if self.next and not self.find_vertex(ev, self.g.ver_sizes.get(self.next)):
-            ver = self.next
-            self.g.form[ver] = (ev.x, ev.y)
-            self.canvas.delete_ribs(self.g, ver)
-            self.canvas.delete_vertex(ver)
-            ribs = self.g.vertices.get(ver)
-            for i in ribs:
-                self.g.find_points_for_rib(i)
-                self.canvas.view_rib(self.g, i)
-                self.g.find_text_layout(i)
-            if self.g.weighted:
-                for i in ribs:
-                    self.canvas.view_rib_weight(self.g, i)
-            self.canvas.view_vertex(self.g, ver)
-            self.next = None
-            self.canvas.unbind('<ButtonRelease-1>')
+            self.do(('move', name, tuple(self.g.form.get(name)), self.point(ev)))
 
 
     def change_vertex_by_popup(self, tvar, func, dict = None):
@@ -497,6 +882,8 @@ class Window:
             self.entry.destroy()
         ev = self.event
         ver = self.get_vertex(ev)
+        if not ver:
+            return
         if dict:
             tvar.set(dict.get(ver))
         else:
@@ -528,6 +915,9 @@ class Window:
         if not ev:
             ev = self.event
         i = self.get_rib(ev)
+        if not i:
+            return
+        self.g.update_geometry([i])
         tvar = IntVar()
         tvar.set(self.g.ribs.get(i)[2])
         self.entry = Entry(self.canvas, width=4, textvariable=tvar)
@@ -551,33 +941,26 @@ class Window:
 
     def rename_vertex(self, old, new):
         if new not in self.g.vertices.keys():
-            self.g.rename_vertex(old, new)
-            self.canvas.delete_vertex(old)
-            self.canvas.view_vertex(self.g, new)
-            self.canvas.tag_bind(new, '<Button-3>', lambda ev: self.view_popup(ev, self.vertex_popup_menu))
-            self.canvas.tag_bind(new, '<B1-Motion>', self.move_vertex_start)
-            self.name_check()
+            self.do(('rename', old, new))  # orientation of its ribs could change, refresh redraws them
 
     def resize_vertex(self, name, size):
-        self.g.ver_sizes[name] = size
-        self.canvas.delete_vertex(name)
-        self.canvas.view_vertex(self.g, name)
-        self.canvas.delete_ribs(self.g, name)
-        for rib in self.g.vertices.get(name):
-            self.g.find_points_for_rib(rib)
-            self.g.find_text_layout(rib)
-            self.canvas.view_rib(self.g, rib)
-            if self.g.weighted:
-                self.canvas.view_rib_weight(self.g, rib)
-        self.canvas.tag_bind(name, '<Button-3>', lambda ev: self.view_popup(ev, self.vertex_popup_menu))
-        self.canvas.tag_bind(name, '<B1-Motion>', self.move_vertex_start)
+        self.history.add(('resize', name, self.g.ver_sizes.get(name), size))
+        self.show_history()
+        self.g.resize_vertex(name, size)
+        ribs = list(self.g.vertices.get(name))
+        if len(ribs) < self.background_limit:
+            self.redraw_vertex(name)
+        else:
+            g = self.g
+            self.start_task('geometry', compute_geometry, geometry_copy(g, ribs), done = lambda copy: self.show_geometry(g, copy, name))
+
+    def redraw_vertex(self, name):
+        # vertex was moved or resized: graph reports its ribs as changed and only they are redrawn
+        self.canvas.mark_vertex(name)
+        self.canvas.refresh(self.g)
 
     def reweigh_rib(self, i, new):
-        rib = self.g.ribs.get(i)
-        rib[2] = new
-        self.canvas.delete_rib_weight(i)
-        if self.g.weighted:
-            self.canvas.view_rib_weight(self.g, i)
+        self.do(('reweigh', i, self.g.ribs.get(i)[2], new))  # rib is reported as changed, so refresh redraws it
 
 
 
@@ -591,4 +974,7 @@ def random_color():
 
 
 if __name__ == '__main__':
+    sys.modules['root'] = sys.modules['__main__']  # stats module finds Window here, not in the second copy of this module
+    if '--stats' in sys.argv:
+        stats.enable()  # before window is made, so all its handlers are measured
     root = Window()
\ No newline at end of file
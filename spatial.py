@@ -0,0 +1,170 @@
+from array import array
+from math import sqrt, inf
+
+
+class GridIndex():
+    '''
+    GridIndex is uniform grid spatial index for rectangles.
+    Plane is divided into square cells with self.cell side. Each key (vertex name or rib index) is stored in every cell which its rectangle intersects.
+    self.cells has cell coordinates as a key and dict of keys (used as set) as a value, self.spans stores cell rectangle for every key.
+    Long thin things (ribs) would fill every cell of their bounding box, so insert_lines stores key only in cells which its lines pass through,
+    they are found by walking every segment from cell to cell (DDA grid traversal). self.lines stores these cells for every such key.
+    Lines inside few cells are stored by their rectangle, it is faster and isn't much bigger.
+
+    insert adds key with rectangle, insert_lines adds key with list of polylines (or they move it if key is already in the index), remove deletes it.
+    merge moves all keys of other index with the same cell size to this one, other index mustn't be used after it.
+    query returns set of keys whose cells intersect given rectangle. Rectangles of these keys can be outside, so caller checks them more precisely.
+
+    '''
+    def __init__(self, cell = 100):
+        self.cell = cell
+        self.cells = {}
+        self.spans = {}
+        self.lines = {}
+
+    def span(self, x1, y1, x2, y2):
+        c = self.cell
+        return int(x1 // c), int(y1 // c), int(x2 // c), int(y2 // c)
+
+    def insert(self, key, x1, y1, x2, y2):
+        if key in self.spans or key in self.lines:
+            self.remove(key)
+        span = self.span(x1, y1, x2, y2)
+        self.spans[key] = span
+        for cx in range(span[0], span[2] + 1):
+            for cy in range(span[1], span[3] + 1):
+                self.cells.setdefault((cx, cy), {})[key] = None
+
+    def insert_lines(self, key, lines):
+        points = [p for line in lines for p in line]
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        x1, y1, x2, y2 = self.span(min(xs), min(ys), max(xs), max(ys))
+        w, h = x2 - x1 + 1, y2 - y1 + 1
+        if w * h <= 2 * (w + h):  # short or straight lines, the rectangle isn't much bigger than the walk and is faster
+            self.insert(key, min(xs), min(ys), max(xs), max(ys))
+            return
+        if key in self.spans or key in self.lines:
+            self.remove(key)
+        places = {}
+        for line in lines:
+            places[self.span(*line[0], *line[0])[:2]] = None  # single point is a line too
+            for k in range(len(line) - 1):
+                places.update(dict.fromkeys(self.segment_cells(*line[k], *line[k+1])))
+        cells = self.cells
+        flat = []  # cell coordinates one after another, small ints take less memory than tuples
+        for place in places:
+            cell = cells.get(place)
+            if cell is None:
+                cell = cells[place] = {}
+            cell[key] = None
+            flat += place
+        self.lines[key] = array('i', flat)
+
+    def segment_cells(self, x1, y1, x2, y2):
+        # cells crossed by segment, in order from (x1, y1) to (x2, y2)
+        c = self.cell
+        cx, cy, ex, ey = self.span(x1, y1, x2, y2)
+        cells = [(cx, cy)]
+        dx, dy = x2 - x1, y2 - y1
+        sx = 1 if dx > 0 else -1
+        sy = 1 if dy > 0 else -1
+        # parameter t of segment (0..1) where the next vertical and horizontal cell borders are crossed, and its step per cell
+        tx = ((cx + (sx > 0)) * c - x1) / dx if dx else inf
+        ty = ((cy + (sy > 0)) * c - y1) / dy if dy else inf
+        step_x = c / abs(dx) if dx else inf
+        step_y = c / abs(dy) if dy else inf
+        for _ in range(abs(ex - cx) + abs(ey - cy)):
+            if cy == ey or (cx != ex and tx < ty):  # rounding mustn't take the walk past the end cell
+                tx += step_x
+                cx += sx
+            else:
+                ty += step_y
+                cy += sy
+            cells.append((cx, cy))
+        return cells
+
+    def remove(self, key):
+        flat = self.lines.pop(key, None)
+        if flat is not None:
+            for k in range(0, len(flat), 2):
+                place = flat[k], flat[k+1]
+                cell = self.cells.get(place)
+                del cell[key]
+                if not cell:
+                    del self.cells[place]
+            return
+        span = self.spans.pop(key, None)
+        if span is None:
+            return
+        for cx in range(span[0], span[2] + 1):
+            for cy in range(span[1], span[3] + 1):
+                cell = self.cells.get((cx, cy))
+                del cell[key]
+                if not cell:
+                    del self.cells[(cx, cy)]
+
+    def merge(self, other):
+        for key in list(other.spans) + list(other.lines):
+            self.remove(key)
+        for place, cell in other.cells.items():
+            mine = self.cells.get(place)
+            if mine is None:
+                self.cells[place] = cell
+            else:
+                mine.update(cell)
+        self.spans.update(other.spans)
+        self.lines.update(other.lines)
+
+    def query(self, x1, y1, x2, y2):
+        span = self.span(x1, y1, x2, y2)
+        keys = set()
+        if (span[2] - span[0] + 1) * (span[3] - span[1] + 1) > len(self.cells):
+            # rectangle is bigger than the filled part of the grid
+            for (cx, cy), cell in self.cells.items():
+                if span[0] <= cx <= span[2] and span[1] <= cy <= span[3]:
+                    keys.update(cell)
+            return keys
+        for cx in range(span[0], span[2] + 1):
+            for cy in range(span[1], span[3] + 1):
+                cell = self.cells.get((cx, cy))
+                if cell:
+                    keys.update(cell)
+        return keys
+
+    def clear(self):
+        self.cells = {}
+        self.spans = {}
+        self.lines = {}
+
+
+def spline_points(points, steps = 8):
+    # points of Tk smooth line: quadratic curves between midpoints of segments, the first and the last curve start and end at the ends of line,
+    # steps points of every curve (as svg.spline_path)
+    if len(points) < 3:
+        return [tuple(p) for p in points]
+    result = [tuple(points[0])]
+    x0, y0 = points[0]
+    for k in range(1, len(points) - 1):
+        x1, y1 = points[k]
+        if k + 2 < len(points):
+            x2, y2 = (x1 + points[k+1][0]) / 2, (y1 + points[k+1][1]) / 2
+        else:
+            x2, y2 = points[k+1]
+        for s in range(1, steps + 1):
+            t = s / steps
+            u = 1 - t
+            result.append((u*u*x0 + 2*u*t*x1 + t*t*x2, u*u*y0 + 2*u*t*y1 + t*t*y2))
+        x0, y0 = x2, y2
+    return result
+
+
+def segment_distance(x, y, x1, y1, x2, y2):
+    # distance from point (x, y) to segment between (x1, y1) and (x2, y2)
+    dx, dy = x2 - x1, y2 - y1
+    vv = dx * dx + dy * dy
+    t = 0
+    if vv:
+        t = max(0, min(1, ((x - x1) * dx + (y - y1) * dy) / vv))
+    px, py = x1 + t * dx, y1 + t * dy
+    return sqrt((x - px) ** 2 + (y - py) ** 2)
@@ -0,0 +1,147 @@
+'''
+Opt-in instrumentation of graph, canvas and window operations.
+
+enable replaces the methods listed in TARGETS by wrappers which measure every call, disable puts the original functions back,
+so when instrumentation is off there is no overhead at all. TARGETS has module or module.Class as a key, names are 'Class.method' or 'module.function'.
+Every operation has Stat with number of calls, total and maximal time and the last Stat.keep latencies for percentiles.
+Methods are looked up when they are called, so wrappers work for calls made after enable. Only functions bound to tkinter events before enable
+(like Window handlers bound when vertex was drawn) are measured after they are bound again, so the editor can be started with --stats to measure everything.
+
+report returns statistics as dict, canvas_items counts items of GraphCanvas, summary makes text for debug overlay (Window.show_stats) and dump writes JSON file.
+
+'''
+
+from collections import deque
+from importlib import import_module
+from time import perf_counter
+import json
+
+TARGETS = {
+    'graph.DictGraph': ['set_vertices', 'set_rib', 'set_ribs', 'restore_rib', 'del_rib', 'del_vertex', 'rename_vertex', 'reweigh_rib',
+                        'set_form', 'move_vertex', 'resize_vertex', 'update_geometry', 'find_geometry', 'find_points_for_rib', 'find_text_layout',
+                        'find_vertex', 'find_rib', 'snapshot'],
+    'arraygraph.ArrayGraph': ['set_vertices', 'set_rib', 'restore_rib', 'del_rib', 'del_vertex', 'rename_vertex', 'update_geometry', 'find_geometry'],
+    'canvas.GraphCanvas': ['view_vertex', 'view_rib', 'view_rib_weight', 'view_bundle', 'view_graph', 'view_visible', 'refresh',
+                           'delete_vertex', 'delete_rib', 'delete_ribs', 'delete_bundle', 'clear_items', 'drag_to', 'flush_batch'],
+    'root.Window': ['set_vertex', 'set_rib', 'drag_vertex', 'drop_vertex', 'resize_vertex', 'rename_vertex', 'reweigh_rib', 'delete_rib_by_id',
+                    'delete_vertex_by_name', 'get_vertex', 'get_rib', 'find_vertex', 'download', 'open_task', 'show_opened', 'save', 'undo', 'redo'],
+    'graphfile': ['save', 'load'],
+    'graphio': ['save', 'load'],
+    'svg': ['save'],
+}
+
+stats = {}  # {'DictGraph.set_rib': Stat, ...}
+originals = {}  # {(owner, attribute): function} while enabled
+
+
+class Stat():
+    '''
+    Stat collects latencies of one operation. add takes time of one call in seconds, percentile returns latency below which part of the last self.keep calls are.
+    '''
+    keep = 1000
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen = self.keep)
+
+    def add(self, t):
+        self.count += 1
+        self.total += t
+        if t > self.max:
+            self.max = t
+        self.samples.append(t)
+
+    def percentile(self, part):
+        samples = sorted(self.samples)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(part * len(samples)))]
+
+    def as_dict(self):
+        return {'count': self.count, 'total': self.total, 'mean': self.total / self.count if self.count else 0.0, 'max': self.max,
+                'p50': self.percentile(0.5), 'p90': self.percentile(0.9), 'p99': self.percentile(0.99)}
+
+
+def wrap(name, func):
+    stat = stats.setdefault(name, Stat())
+
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stat.add(perf_counter() - start)
+    wrapper.__name__, wrapper.__doc__ = func.__name__, func.__doc__
+    return wrapper
+
+
+def enable(targets = TARGETS):
+    for path, names in targets.items():
+        module, _, cls = path.partition('.')
+        owner = import_module(module)
+        if cls:
+            owner = getattr(owner, cls)
+        for attr in names:
+            if (owner, attr) in originals:
+                continue
+            func = getattr(owner, attr)
+            originals[(owner, attr)] = func
+            setattr(owner, attr, wrap('{}.{}'.format(cls or module, attr), func))
+
+
+def disable():
+    for (owner, attr), func in originals.items():
+        setattr(owner, attr, func)
+    originals.clear()
+
+
+def enabled():
+    return bool(originals)
+
+
+def reset():
+    for stat in stats.values():
+        stat.__init__()
+
+
+def canvas_items(canvas):
+    # items which GraphCanvas keeps for graph, it doesn't ask tkinter, so it works with stand-in canvases too
+    return {'vertices': len(canvas.vertex_items), 'ribs': len(canvas.rib_items), 'weights': len(canvas.weight_items),
+            'bundles': len(canvas.bundle_items), 'dirty': len(canvas.dirty_vertices) + len(canvas.dirty_ribs)}
+
+
+def report(canvas = None):
+    result = {'operations': {name: stat.as_dict() for name, stat in stats.items() if stat.count}}
+    if canvas is not None:
+        result['canvas'] = canvas_items(canvas)
+    return result
+
+
+def summary(canvas = None, limit = 12):
+    # operations with the largest total time
+    lines = ['{:<28} {:>7} {:>9} {:>8} {:>8}'.format('operation', 'calls', 'total ms', 'p50 ms', 'p99 ms')]
+    for name, stat in sorted(stats.items(), key = lambda e: -e[1].total)[:limit]:
+        if stat.count:
+            lines.append('{:<28} {:>7} {:>9.1f} {:>8.2f} {:>8.2f}'.format(name, stat.count, stat.total * 1000, stat.percentile(0.5) * 1000, stat.percentile(0.99) * 1000))
+    if canvas is not None:
+        lines.append(' '.join('{} {}'.format(k, v) for k, v in canvas_items(canvas).items()))
+    return '\n'.join(lines)
+
+
+def dump(filename, canvas = None):
+    with open(filename, 'w') as f:
+        json.dump(report(canvas), f, indent = 1, sort_keys = True)
+
+
+if __name__ == '__main__':
+    from graph import DictGraph
+    enable({'graph.DictGraph': TARGETS['graph.DictGraph']})
+    g = DictGraph(*[str(k) for k in range(100)])
+    g.set_form(*[[50 + 100 * (k % 10), 50 + 100 * (k // 10)] for k in range(100)])
+    for k in range(1000):
+        g.set_rib(str(k % 100), str(k * 7 % 100 if k * 7 % 100 != k % 100 else (k + 1) % 100))
+    g.update_geometry()
+    disable()
+    print(summary())
@@ -0,0 +1,98 @@
+'''
+Streaming export of graph pictures to SVG.
+
+SvgRenderer is Renderer (render module) which writes every vertex, rib and weight to file as soon as it is drawn, so picture of any graph is written in one pass.
+Geometry is kept only for one chunk of ribs at once, ribs which had no geometry before export forget it again. The picture is the same as on GraphCanvas: vertices are circles with names, ribs are Tk smooth lines
+(quadratic Bezier curves through midpoints of segments of rib points) with arrows of Tk default shape, weights are rotated texts.
+Picture starts at (0, 0) and is 50 points bigger than the farthest vertex, like the scrolled region of the editor.
+
+save draws graph to SVG file. It works without display, so big graphs can be drawn by batch job:
+    python svg.py graph.graph picture.svg
+reads graph by graphfile (or graphio for edge lists, GraphML and DOT files, they are placed on grid) and writes picture.
+
+'''
+
+import sys
+from xml.sax.saxutils import escape, quoteattr
+from render import Renderer, vertex_look, rib_look, weight_look, arrow_polygon
+
+STYLE = 'circle{stroke-width:3}path{fill:none;stroke-width:3}text{font-family:sans-serif;text-anchor:middle;dominant-baseline:central}.w{font-size:11pt}'
+
+
+class SvgRenderer(Renderer):
+    '''
+    self.f is text file which SVG is written to. view_graph writes the whole document, view functions write one element each.
+    '''
+    def __init__(self, f):
+        self.f = f
+
+    def view_graph(self, g):
+        right, bottom = 600, 400  # size of empty canvas
+        if g.form:
+            right = max(right, max(coor[0] for coor in g.form.values()) + 50)
+            bottom = max(bottom, max(coor[1] for coor in g.form.values()) + 50)
+        self.f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.f.write('<svg xmlns="http://www.w3.org/2000/svg" width="{0:.0f}" height="{1:.0f}" viewBox="0 0 {0:.0f} {1:.0f}">\n'.format(right, bottom))
+        self.f.write('<style>{}</style>\n<rect width="100%" height="100%" fill="white"/>\n'.format(STYLE))
+        Renderer.view_graph(self, g)
+        self.f.write('</svg>\n')
+
+    def view_vertex(self, g, name):
+        x, y, size, fill, outline = vertex_look(g, name)
+        self.f.write('<circle cx="{:.1f}" cy="{:.1f}" r="{}" fill={} stroke={}/>'.format(x, y, size, quoteattr(fill), quoteattr(outline)))
+        self.f.write('<text x="{:.1f}" y="{:.1f}" fill={}>{}</text>\n'.format(x, y, quoteattr(outline), escape(name)))
+
+    def view_rib(self, g, i):
+        points, fill, arrow = rib_look(g, i)
+        points = list(points)
+        colour = quoteattr(fill)
+        heads = []
+        if arrow in ('first', 'both'):
+            heads.append(arrow_polygon(points[1], points[0]))
+            points[0] = heads[-1][2]  # line ends at the neck of arrow
+        if arrow in ('last', 'both'):
+            heads.append(arrow_polygon(points[-2], points[-1]))
+            points[-1] = heads[-1][2]
+        self.f.write('<path d="{}" stroke={}/>'.format(spline_path(points), colour))
+        for head in heads:
+            self.f.write('<polygon points="{}" fill={}/>'.format(' '.join('{:.1f},{:.1f}'.format(x, y) for x, y in head), colour))
+        self.f.write('\n')
+
+    def view_rib_weight(self, g, i):
+        x, y, angle, text, fill = weight_look(g, i)
+        rotation = ' transform="rotate({:.1f} {:.1f} {:.1f})"'.format(-angle, x, y) if angle else ''  # Tk angle is counterclockwise
+        self.f.write('<text class="w" x="{:.1f}" y="{:.1f}" fill={}{}>{}</text>\n'.format(x, y, quoteattr(fill or 'black'), rotation, escape(str(text))))
+
+
+def spline_path(points):
+    # Tk smooth line: every inner point is control point of quadratic curve between midpoints of its segments
+    path = ['M{:.1f} {:.1f}'.format(*points[0])]
+    if len(points) == 2:
+        path.append('L{:.1f} {:.1f}'.format(*points[1]))
+        return ' '.join(path)
+    for k in range(1, len(points) - 1):
+        x, y = points[k]
+        if k + 2 < len(points):
+            ex, ey = (x + points[k + 1][0]) / 2, (y + points[k + 1][1]) / 2
+        else:
+            ex, ey = points[k + 1]
+        path.append('Q{:.1f} {:.1f} {:.1f} {:.1f}'.format(x, y, ex, ey))
+    return ' '.join(path)
+
+
+def save(g, filename):
+    with open(filename, 'w', encoding = 'utf-8') as f:
+        SvgRenderer(f).view_graph(g)
+
+
+if __name__ == '__main__':
+    import graphfile
+    import graphio
+    source, target = sys.argv[1], sys.argv[2]
+    if graphfile.is_graph_file(source):
+        g = graphfile.load(source)
+    else:
+        g = graphio.load(source)
+        if not g.form:
+            graphio.place_on_grid(g)
+    save(g, target)
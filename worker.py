@@ -0,0 +1,189 @@
+from concurrent.futures import ThreadPoolExecutor
+import gc
+from graph import DictGraph, pair
+from arraygraph import ArrayGraph
+
+
+class Cancelled(Exception):
+    pass
+
+
+class Task():
+    '''
+    Task is one computation started by Worker.
+    Function of the task reports its progress by self.progress with part of done work and calls self.check between steps.
+    Both raise Cancelled when task is cancelled, so self.progress can be given as progress function to loaders and layout.
+    cancel can be called from tkinter thread at any time, done function isn't called for cancelled task.
+    '''
+    def __init__(self, done = None, failed = None, progress = None):
+        self.done = done
+        self.failed = failed
+        self.show_progress = progress
+        self.part = 0
+        self.shown = None
+        self.cancelled = 0
+        self.future = None
+
+    def progress(self, part):
+        self.check()
+        self.part = part
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled()
+
+    def stop(self):
+        # for functions which take stop function, like layout.force_layout
+        return self.cancelled
+
+    def cancel(self):
+        self.cancelled = 1
+
+
+class Worker():
+    '''
+    Worker runs heavy graph computations (geometry, layout, loading files) in background threads, so tkinter mainloop isn't blocked.
+    run starts function in thread pool and returns Task, function gets the task as the first argument.
+    Worker polls running tasks by widget.after every self.interval ms and calls their progress, done and failed functions in tkinter thread,
+    so only they can change canvas. Errors of tasks without failed function are raised in tkinter thread.
+    Functions of tasks mustn't change graph which is drawn now, as tkinter thread edits and draws it meanwhile. They compute new graph,
+    or geometry of its copy made by geometry_copy in tkinter thread, which is put into the graph by apply_geometry in done function,
+    or new form of its copy made by layout_copy. Pictures are drawn from picture_copy, the whole graph with geometry computed so far.
+    cancel cancels all tasks, busy tells if there are running tasks.
+    '''
+    def __init__(self, widget, threads = 2, interval = 50):
+        self.widget = widget
+        self.pool = ThreadPoolExecutor(threads)
+        self.interval = interval
+        self.tasks = []
+        self.polling = None
+
+    def run(self, func, *args, done = None, failed = None, progress = None):
+        task = Task(done, failed, progress)
+        task.future = self.pool.submit(func, task, *args)
+        self.tasks.append(task)
+        if not self.polling:
+            self.polling = self.widget.after(self.interval, self.poll)
+        return task
+
+    def poll(self):
+        self.polling = None
+        finished = [task for task in self.tasks if task.future.done()]
+        self.tasks = [task for task in self.tasks if not task.future.done()]
+        if self.tasks:
+            self.polling = self.widget.after(self.interval, self.poll)
+        for task in self.tasks:
+            if task.show_progress and task.part != task.shown and not task.cancelled:
+                task.shown = task.part
+                task.show_progress(task.part)
+        for task in finished:
+            if task.cancelled:
+                continue
+            error = task.future.exception()
+            if error is None:
+                if task.done:
+                    task.done(task.future.result())
+            elif task.failed:
+                task.failed(error)
+            else:
+                raise error
+
+    def cancel(self):
+        for task in self.tasks:
+            task.cancel()
+
+    def busy(self):
+        return bool(self.tasks)
+
+    def shutdown(self):
+        # after mainloop, so widget isn't used
+        self.cancel()
+        self.pool.shutdown(wait = False)
+
+
+def geometry_copy(g, ribs = None):
+    # DictGraph with everything geometry of given ribs (all stale ribs by default) depends on: form, vertex sizes and their families
+    ribs = list(g.stale) if ribs is None else [i for i in ribs if i in g.stale]
+    c = DictGraph()
+    c.form, c.ver_sizes = dict(g.form), dict(g.ver_sizes)
+    for i in ribs:
+        rib = g.ribs.get(i)
+        key = pair(rib[0], rib[1])
+        if key not in c.pairs:
+            family = c.pairs[key] = dict(g.pairs.get(key))
+            for e in family:
+                rib = g.ribs.get(e)
+                c.ribs[e] = [rib[0], rib[1], rib[2], set(rib[3])]
+    c.stale = dict.fromkeys(ribs)
+    c.invalidations = g.invalidations
+    return c
+
+
+def layout_copy(g):
+    # DictGraph with everything layout.compute_form reads: vertices, form, vertex sizes and pairs of vertices joined by ribs (families themselves aren't copied)
+    c = DictGraph()
+    c.vertices = {name: set() for name in g.vertices}
+    c.form, c.ver_sizes = dict(g.form), dict(g.ver_sizes)
+    c.pairs = dict.fromkeys(g.pairs, {})
+    return c
+
+
+def picture_copy(g):
+    # graph with everything drawn by render.Renderer, computed geometry is shared, stale ribs are computed and forgotten by renderer
+    if isinstance(g, ArrayGraph):
+        return array_picture_copy(g)
+    c = DictGraph()
+    collect = gc.isenabled()
+    gc.disable()  # a lot of small lists and dicts are created here, garbage collector passes only slow it down
+    try:
+        c.vertices = {name: set() for name in g.vertices}
+        c.form, c.ver_sizes, c.ver_colours = dict(g.form), dict(g.ver_sizes), dict(g.ver_colours)
+        c.ribs = {i: [rib[0], rib[1], rib[2], set(rib[3])] for i, rib in g.ribs.items()}
+        c.pairs = {key: dict(family) for key, family in g.pairs.items()}
+        c.rib_colours, c.weight_colours = dict(g.rib_colours), dict(g.weight_colours)
+        for name in ('rib_points', 'rib_points_simple', 'rib_orientation', 'rib_text_layout', 'rib_text_layout_simple'):
+            setattr(c, name, dict(getattr(g, name)))
+    finally:
+        if collect:
+            gc.enable()
+    c.stale = dict(g.stale)
+    c.directed, c.weighted, c.multigraph = g.directed, g.weighted, g.multigraph
+    return c
+
+
+def array_picture_copy(g):
+    # ArrayGraph copies its arrays at once, item by item copy through its views would be much slower
+    c = ArrayGraph()
+    c.vertices = {name: {} for name in g.vertices}
+    c.form, c.ver_sizes, c.ver_colours = dict(g.form), dict(g.ver_sizes), dict(g.ver_colours)
+    c.pairs = {key: dict(family) for key, family in g.pairs.items()}
+    c.names, c.numbers = list(g.names), dict(g.numbers)
+    for name in ('ends', 'weights', 'dirs', 'alive', 'orientation', 'points', 'points_simple', 'layout', 'layout_simple', 'colours', 'wcolours'):
+        setattr(c, name, getattr(g, name)[:])
+    c.palette, c.palette_numbers = list(g.palette), dict(g.palette_numbers)
+    c.stale = dict(g.stale)
+    c.directed, c.weighted, c.multigraph = g.directed, g.weighted, g.multigraph
+    return c
+
+
+def apply_geometry(g, c):
+    # puts geometry computed for copy into graph, if graph geometry was invalidated since the copy was made, nothing is put
+    # and stale ribs are computed when they are drawn. Returns 1 if geometry is put.
+    if g.invalidations != c.invalidations:
+        return 0
+    for name in ('rib_points', 'rib_points_simple', 'rib_orientation', 'rib_text_layout', 'rib_text_layout_simple'):
+        getattr(g, name).update(getattr(c, name))
+    g.rib_grid.merge(c.rib_grid)
+    for i in c.rib_points:
+        g.stale.pop(i, None)
+    return 1
+
+
+def compute_geometry(task, g, ribs = None, batch = 5000):
+    # update_geometry by batches of ribs, so it can be cancelled and shows progress
+    ribs = list(g.stale) if ribs is None else [i for i in ribs if i in g.stale]
+    for k in range(0, len(ribs), batch):
+        task.check()
+        g.update_geometry(ribs[k:k+batch])
+        task.progress((k + batch) / len(ribs))
+    return g